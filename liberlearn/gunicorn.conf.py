@@ -0,0 +1,54 @@
+"""
+Gunicorn settings for the WSGI deployment, started by ``manage.py boot``.
+
+The app is imported once in the master and its caches are warmed there, so
+workers fork ready to serve instead of each paying for Django's start-up.
+"""
+import os
+import time
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+preload_app = True
+
+
+def when_ready(server):
+    from liberlearn.core import metrics
+    from liberlearn.core.warmup import warm_up
+
+    # Counts left by the workers of an earlier run
+    metrics.reset()
+
+    try:
+        warm_up()
+    except Exception:
+        # A cold cache is slower, not broken; keep booting.
+        server.log.exception("Cache warm-up failed")
+    started = os.environ.get("LIBERLEARN_BOOT_STARTED")
+    if started:
+        server.log.info(
+            "Cold start: ready to accept connections %.2fs after boot",
+            time.time() - float(started),
+        )
+
+
+def post_worker_init(worker):
+    from django.conf import settings
+
+    from liberlearn.core import memory
+
+    # SIGUSR2 to a worker (not the master, where it means upgrade) starts
+    # tracing its allocations, then reports their growth.
+    memory.install_signal_handler()
+    if settings.MEMORY_TRACE_FRAMES:
+        memory.start()
+
+
+def post_request(worker, req, environ, resp):
+    from liberlearn.core import memory
+
+    if memory.over_ceiling():
+        # Finishes the current request, then the master forks a fresh one.
+        worker.log.warning(
+            "Worker %s is over the memory ceiling, recycling it", worker.pid
+        )
+        worker.alive = False
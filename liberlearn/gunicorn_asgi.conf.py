@@ -0,0 +1,20 @@
+"""
+Gunicorn settings for serving liberlearn.asgi with uvicorn workers.
+
+    cd liberlearn && gunicorn liberlearn.asgi:application -c gunicorn_asgi.conf.py
+
+Each worker is a single event loop, so a slow client only costs an open
+socket instead of a whole worker; the async endpoints under /api/async/ run
+without borrowing a thread while the response trickles out.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+
+# Room for thousands of idle or slow-network connections per process.
+backlog = 4096
+keepalive = 75
+timeout = 120
+graceful_timeout = 30
@@ -1,9 +1,55 @@
+from functools import partial
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
 from django.db.models import Q
 
+from liberlearn.core.cache import bump_versions, get_versions
+from liberlearn.core.timing import phase
+
+from .models import PROFILE_RELATED_NAMES
+
+# Bumped when a user's own permissions or groups change
+USER_PERMISSIONS_VERSION_KEY = "permissions-version:{}"
+# Bumped when what a group or permission grants changes, for everyone
+PERMISSIONS_VERSION_KEY = "permissions-version"
+PERMISSIONS_KEY = "permissions:{source}:{user}:{superuser}:{versions}"
+PERMISSIONS_TIMEOUT = 24 * 60 * 60
+# In a per-process cache the other workers never see a version bump, so a
+# revoked permission must expire quickly.
+UNSHARED_PERMISSIONS_TIMEOUT = 10
+PERMISSION_SOURCES = ("user", "group")
+USER_KEY = "auth-user:{}"
+
+
+def invalidate_user(user_id):
+    cache.delete(USER_KEY.format(user_id))
+
+
+def invalidate_permissions(user_ids=None):
+    """
+    Drop the cached permissions of ``user_ids``, or of every user if not
+    given, once the change commits; a reader could otherwise cache the old
+    permissions under the new version.
+    """
+    if user_ids is None:
+        keys = [PERMISSIONS_VERSION_KEY]
+    else:
+        keys = [USER_PERMISSIONS_VERSION_KEY.format(pk) for pk in user_ids]
+    transaction.on_commit(partial(bump_versions, keys))
+
+
+def permissions_timeout():
+    if settings.CACHE_IS_SHARED:
+        return PERMISSIONS_TIMEOUT
+    return UNSHARED_PERMISSIONS_TIMEOUT
+
 
 class EmailOrUsernameModelBackend(ModelBackend):
+    @phase("auth")
     def authenticate(self, request, username=None, password=None, **kwargs):
         User = get_user_model()
 
@@ -25,3 +71,72 @@ class EmailOrUsernameModelBackend(ModelBackend):
             return user
 
         return None
+
+    @phase("auth")
+    def get_user(self, user_id):
+        """
+        The session's user together with their role profile, loaded in one
+        query and, when the cache is shared, kept there for
+        AUTH_USER_CACHE_TIMEOUT seconds.
+        """
+        key = USER_KEY.format(user_id)
+        # In a per-process cache invalidate_user() wouldn't reach the other
+        # workers, which would go on serving a deactivated user.
+        user = cache.get(key) if settings.CACHE_IS_SHARED else None
+        if user is None:
+            User = get_user_model()
+            try:
+                user = User._default_manager.select_related(*PROFILE_RELATED_NAMES).get(
+                    pk=user_id
+                )
+            except User.DoesNotExist:
+                return None
+            if settings.CACHE_IS_SHARED:
+                cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
+
+    def _get_permissions(self, user_obj, obj, from_name):
+        """
+        ModelBackend keeps the resolved permissions on the user object, so
+        they're queried once per request. Share them across requests and
+        processes through the cache too, briefly unless it is shared.
+        """
+        perm_cache_name = "_%s_perm_cache" % from_name
+        if (
+            user_obj.is_active
+            and not user_obj.is_anonymous
+            and obj is None
+            and not hasattr(user_obj, perm_cache_name)
+        ):
+            self._load_cached_permissions(user_obj)
+            if not hasattr(user_obj, perm_cache_name):
+                perms = super()._get_permissions(user_obj, obj, from_name)
+                cache.set(
+                    user_obj._permission_cache_keys[from_name],
+                    perms,
+                    permissions_timeout(),
+                )
+                return perms
+        return super()._get_permissions(user_obj, obj, from_name)
+
+    def _load_cached_permissions(self, user_obj):
+        if hasattr(user_obj, "_permission_cache_keys"):
+            return
+        versions = get_versions(
+            PERMISSIONS_VERSION_KEY, USER_PERMISSIONS_VERSION_KEY.format(user_obj.pk)
+        )
+        # Superusers get every permission, so it's part of the key.
+        keys = {
+            source: PERMISSIONS_KEY.format(
+                source=source,
+                user=user_obj.pk,
+                superuser=int(user_obj.is_superuser),
+                versions=":".join(map(str, versions)),
+            )
+            for source in PERMISSION_SOURCES
+        }
+        user_obj._permission_cache_keys = keys
+        cached = cache.get_many(keys.values())
+        for source, key in keys.items():
+            if key in cached:
+                setattr(user_obj, "_%s_perm_cache" % source, cached[key])
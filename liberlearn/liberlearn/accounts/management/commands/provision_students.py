@@ -0,0 +1,53 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from liberlearn.accounts.provisioning import COLUMNS, provision_students
+
+REPORT_COLUMNS = ("line", "username", "status", "id", "password", "error")
+
+
+class Command(BaseCommand):
+    help = (
+        "Create student accounts from a CSV file with the columns "
+        f"{', '.join(COLUMNS)} and write a per-row report"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_file", help="CSV file with a header line")
+        parser.add_argument(
+            "--report",
+            help="Where to write the report CSV (default: stdout). It holds "
+            "the generated passwords, so keep it safe.",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            help="Password hashing processes (default: one per CPU)",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            with open(options["csv_file"], newline="") as file:
+                report = provision_students(file, processes=options["processes"])
+        except OSError as exc:
+            raise CommandError(exc)
+
+        if options["report"]:
+            with open(options["report"], "w", newline="") as output:
+                self.write_report(output, report)
+        else:
+            self.write_report(self.stdout, report)
+
+        created = sum(entry["status"] == "created" for entry in report)
+        self.stderr.write(
+            f"{created} created, {len(report) - created} failed "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+    def write_report(self, output, report):
+        writer = csv.DictWriter(output, REPORT_COLUMNS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(report)
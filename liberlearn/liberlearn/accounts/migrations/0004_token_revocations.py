@@ -0,0 +1,22 @@
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_revocations_table(apps, schema_editor):
+    # Only there when token revocations aren't kept in a shared cache, see
+    # API_TOKEN_CACHE.
+    call_command(
+        "createcachetable",
+        database=schema_editor.connection.alias,
+        verbosity=0,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0003_alter_facility_options_alter_mentor_options_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_revocations_table, migrations.RunPython.noop),
+    ]
@@ -9,6 +9,10 @@ from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
+# The one-to-one profile of each role, by related name; they match the roles.
+PROFILE_RELATED_NAMES = ("student", "mentor", "facility")
+
+
 class UserManager(BaseUserManager):
     def _create_user(self, email, username, password, **extra_fields):
         if not email and not username:
@@ -82,6 +86,14 @@ class User(AbstractBaseUser, PermissionsMixin):
     def is_student(self):
         return self.role == "student"
 
+    @property
+    def profile(self):
+        """The Student, Mentor or Facility row of the user's role, if any"""
+        if self.role not in PROFILE_RELATED_NAMES:
+            return None
+        # Missing profiles raise RelatedObjectDoesNotExist, an AttributeError.
+        return getattr(self, self.role, None)
+
     # Change this to 'email' if you want email as the default login field
     USERNAME_FIELD = "username"
     REQUIRED_FIELDS = [
@@ -0,0 +1,182 @@
+"""
+Bulk creation of student accounts from a CSV file.
+
+Password hashing is what makes creating users one by one slow, so all the
+passwords are hashed up front across a process pool; the rows are then
+validated against the database and inserted with ``bulk_create`` a chunk at
+a time, each chunk in its own transaction.
+
+Hashing takes a good fraction of a second per password, so only small files
+are provisioned within a request, hashing in the worker itself rather than
+forking it (PROVISION_MAX_ROWS rows, one chunk, one transaction); bigger
+ones go through the provision_students command.
+"""
+import csv
+import io
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import Student, User
+
+COLUMNS = (
+    "username",
+    "email",
+    "password",
+    "first_name",
+    "last_name",
+    "batch",
+    "roll_no",
+)
+REQUIRED_COLUMNS = ("username", "first_name", "last_name", "batch", "roll_no")
+CHUNK_SIZE = 500
+
+
+class ProvisioningError(Exception):
+    pass
+
+
+def _setup_worker():
+    # Workers started with "spawn" (macOS, Windows) don't inherit a
+    # configured Django.
+    django.setup()
+
+
+def hash_passwords(passwords, processes=None):
+    """make_password() for each of ``passwords``, in parallel"""
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(passwords) < 2:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (processes * 4))
+    with ProcessPoolExecutor(processes, initializer=_setup_worker) as pool:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def read_rows(file):
+    """
+    The rows of a CSV file (text or binary) with a header line naming some
+    of COLUMNS, numbered by line, with the username and email normalized as
+    they are stored.
+    """
+    if isinstance(file.read(0), bytes):
+        file = io.TextIOWrapper(file, encoding="utf-8-sig")
+    reader = csv.DictReader(file)
+    for row in reader:
+        row = {column: (row.get(column) or "").strip() for column in COLUMNS}
+        row["username"] = User.normalize_username(row["username"])
+        row["email"] = User.objects.normalize_email(row["email"])
+        yield reader.line_num, row
+
+
+def row_errors(row):
+    missing = [column for column in REQUIRED_COLUMNS if not row[column]]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    if len(row["username"]) > User._meta.get_field("username").max_length:
+        return "username is too long"
+    return None
+
+
+def provision_students(file, processes=None, chunk_size=CHUNK_SIZE, max_rows=None):
+    """
+    Create a student account for each row of ``file``. Returns one report
+    entry per row; rows without a password get a generated one, reported
+    back once. Raises ProvisioningError, creating nobody, if the file has
+    more than ``max_rows`` rows.
+    """
+    report = []
+    rows = []
+    seen = set()
+    for line, row in read_rows(file):
+        if max_rows is not None and len(report) >= max_rows:
+            raise ProvisioningError(
+                f"More than {max_rows} rows; split the file or use the "
+                "provision_students command."
+            )
+        entry = {"line": line, "username": row["username"]}
+        report.append(entry)
+        error = row_errors(row)
+        identities = {row["username"].lower(), row["email"].lower()} - {""}
+        if not error and identities & seen:
+            error = "duplicate username or email in file"
+        if error:
+            entry.update(status="error", error=error)
+            continue
+        seen |= identities
+        if not row["password"]:
+            row["password"] = entry["password"] = secrets.token_urlsafe(9)
+        rows.append((entry, row))
+
+    hashes = hash_passwords([row["password"] for _, row in rows], processes)
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = list(
+            zip(rows[start : start + chunk_size], hashes[start : start + chunk_size])
+        )
+        # A second try finds the accounts created since the first one
+        # checked, e.g. by a concurrent request, taken.
+        for attempt in range(2):
+            try:
+                create_chunk(chunk)
+                break
+            except IntegrityError:
+                continue
+        else:
+            for (entry, _), _ in chunk:
+                if entry.get("status") != "error":
+                    entry.update(status="error", error="username or email taken")
+                    entry.pop("password", None)
+    return report
+
+
+def create_chunk(chunk):
+    """
+    Create the accounts of the ((entry, row), password) of ``chunk`` whose
+    username and email aren't taken, in one transaction
+    """
+    usernames = [row["username"] for (_, row), _ in chunk]
+    emails = [row["email"] for (_, row), _ in chunk if row["email"]]
+    taken = set()
+    for username, email in User.objects.filter(
+        Q(username__in=usernames) | Q(email__in=emails)
+    ).values_list("username", "email"):
+        taken |= {username, email}
+
+    users = []
+    created = []
+    for (entry, row), password in chunk:
+        if row["username"] in taken or row["email"] in taken:
+            entry.update(status="error", error="username or email taken")
+            entry.pop("password", None)
+            continue
+        users.append(
+            User(
+                username=row["username"],
+                email=row["email"] or None,
+                password=password,
+                role="student",
+                first_name=row["first_name"],
+                last_name=row["last_name"],
+            )
+        )
+        created.append((entry, row))
+
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        Student.objects.bulk_create(
+            Student(
+                user=user,
+                first_name=row["first_name"],
+                last_name=row["last_name"],
+                batch=row["batch"],
+                roll_no=row["roll_no"],
+            )
+            for user, (_, row) in zip(users, created)
+        )
+    for user, (entry, _) in zip(users, created):
+        entry.update(status="created", id=user.pk)
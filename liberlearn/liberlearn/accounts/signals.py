@@ -0,0 +1,80 @@
+from django.contrib.auth.models import Group, Permission
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .backends import invalidate_permissions, invalidate_user
+from .models import Facility, Mentor, Student, User
+from .tokens import USER_CLAIMS, revoke_user_tokens
+
+
+@receiver(pre_save, sender=User)
+def remember_token_claims(sender, instance, update_fields, raw, **kwargs):
+    # Tokens carry these, so changing one must revoke them; saves of other
+    # fields (last_login on every login) needn't look.
+    attrs = set(USER_CLAIMS.values())
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not attrs & set(update_fields):
+        return
+    instance._stored_claims = User.objects.filter(pk=instance.pk).values(*attrs).first()
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_credentials_change(sender, instance, **kwargs):
+    # set_password() leaves the raw password in _password until save()
+    # finishes, so it is still set while post_save runs.
+    stored = instance.__dict__.pop("_stored_claims", None)
+    claims_changed = stored is not None and any(
+        getattr(instance, attr) != value for attr, value in stored.items()
+    )
+    if not instance.is_active or instance._password is not None or claims_changed:
+        revoke_user_tokens(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Mentor)
+@receiver(post_save, sender=Facility)
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Mentor)
+@receiver(post_delete, sender=Facility)
+def invalidate_cached_profile_user(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
+
+
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_user_permissions(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        # user.user_permissions or user.groups changed
+        if action in ("post_add", "post_remove", "post_clear"):
+            invalidate_permissions([instance.pk])
+        return
+    # permission.user_set or group.user_set changed; clear() doesn't say who
+    # was removed, so remember them beforehand.
+    if action == "pre_clear":
+        instance._cleared_user_ids = list(
+            instance.user_set.values_list("pk", flat=True)
+        )
+    elif action == "post_clear":
+        invalidate_permissions(instance.__dict__.pop("_cleared_user_ids", []))
+    elif action in ("post_add", "post_remove"):
+        invalidate_permissions(pk_set)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_group_permissions(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_permissions()
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def invalidate_all_permissions(sender, **kwargs):
+    invalidate_permissions()
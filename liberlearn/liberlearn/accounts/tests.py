@@ -1,3 +1,47 @@
+import io
+from unittest import mock
+
+from django.db import IntegrityError
 from django.test import TestCase
 
-# Create your tests here.
+from .models import User
+from .provisioning import provision_students
+
+CSV = (
+    "username,email,password,first_name,last_name,batch,roll_no\n"
+    "ada,ada@EXAMPLE.com,secret,Ada,Lovelace,2024,1\n"
+    "alan,alan@example.com,secret,Alan,Turing,2024,2\n"
+)
+
+
+class ProvisioningTests(TestCase):
+    def provision(self):
+        return provision_students(io.StringIO(CSV), processes=1)
+
+    def statuses(self, report):
+        return {entry["username"]: entry["status"] for entry in report}
+
+    def test_email_taken_with_other_case_domain(self):
+        User.objects.create_user(email="ada@example.com", username="lovelace")
+        report = self.provision()
+        self.assertEqual(self.statuses(report), {"ada": "error", "alan": "created"})
+
+    def test_accounts_created_since_the_check(self):
+        bulk_create = User.objects.bulk_create
+        calls = []
+
+        def conflict_once(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                raise IntegrityError
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(User.objects, "bulk_create", side_effect=conflict_once):
+            report = self.provision()
+        self.assertEqual(self.statuses(report), {"ada": "created", "alan": "created"})
+
+        User.objects.all().delete()
+        with mock.patch.object(User.objects, "bulk_create", side_effect=IntegrityError):
+            report = self.provision()
+        self.assertEqual(self.statuses(report), {"ada": "error", "alan": "error"})
+        self.assertNotIn("password", report[1])
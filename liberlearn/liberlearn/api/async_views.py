@@ -0,0 +1,186 @@
+"""
+Async variants of the read-only catalog and course-content endpoints.
+
+Under ASGI these never hold a worker thread while waiting on a slow client;
+the whole tree for a response is fetched up front with the async ORM and
+turned into the same payloads the DRF serializers produce.
+"""
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Prefetch
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views import View
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated
+from rest_framework.fields import DateTimeField
+
+from ..course.models import Content, Course, Lesson, Subject
+from .authentication import SignedTokenAuthentication
+
+
+def course_queryset():
+    contents = Content.objects.select_related("content_type").prefetch_related(
+        "image_content"
+    )
+    lessons = Lesson.objects.prefetch_related(Prefetch("contents", queryset=contents))
+    # Meta.ordering is dropped from aggregate queries, so restate it.
+    return (
+        Course.objects.annotate(number_of_students=Count("students"))
+        .order_by(*Course._meta.ordering)
+        .prefetch_related(Prefetch("lessons", queryset=lessons))
+    )
+
+
+def subject_queryset():
+    return Subject.objects.prefetch_related(
+        Prefetch("courses", queryset=course_queryset())
+    )
+
+
+def absolute_url(request, view_name, pk):
+    return request.build_absolute_uri(reverse(view_name, kwargs={"pk": pk}))
+
+
+def image_data(image):
+    return {
+        "id": image.id,
+        "title": image.title,
+        "url": image.url,
+        "srcset": image.srcset,
+    }
+
+
+def content_data(content):
+    images = []
+    if content.content_type.model == "image":
+        images = [image_data(image) for image in content.image_content.all()]
+    return {
+        "id": content.id,
+        "order": content.order,
+        "content_type": str(content.content_type).split()[-1],
+        "data": content.data,
+        "images": images,
+    }
+
+
+def lesson_data(lesson):
+    return {
+        "id": lesson.id,
+        "order": lesson.order,
+        "title": lesson.title,
+        "description": lesson.description,
+        "contents": [content_data(c) for c in lesson.contents.all()],
+    }
+
+
+def course_data(course, request):
+    """Mirrors CourseListSerializer"""
+    return {
+        "id": course.id,
+        "url": absolute_url(request, "course-detail", course.pk),
+        "title": course.title,
+        "overview": course.overview,
+        "slug": course.slug,
+        "created_at": DateTimeField().to_representation(course.created_at),
+        "subject": absolute_url(request, "subject-detail", course.subject_id),
+        "mentor": course.mentor_id,
+        "number_of_students": course.number_of_students,
+        "lessons": [lesson_data(lesson) for lesson in course.lessons.all()],
+    }
+
+
+def subject_data(subject, request):
+    """Mirrors SubjectSerializer"""
+    courses = subject.courses.all()
+    return {
+        "id": subject.id,
+        "url": absolute_url(request, "subject-detail", subject.pk),
+        "title": subject.title,
+        "info": subject.info,
+        "image_link": subject.image_link,
+        "image_srcset": subject.image_srcset,
+        "intro_video": subject.intro_video,
+        "slug": subject.slug,
+        "number_of_courses": len(courses),
+        "courses": [course_data(course, request) for course in courses],
+    }
+
+
+def not_found():
+    return JsonResponse({"detail": "Not found."}, status=404)
+
+
+class SubjectListView(View):
+    async def get(self, request):
+        subjects = [subject async for subject in subject_queryset()]
+        return JsonResponse(
+            [subject_data(subject, request) for subject in subjects], safe=False
+        )
+
+
+class SubjectDetailView(View):
+    async def get(self, request, pk):
+        try:
+            subject = await subject_queryset().aget(pk=pk)
+        except Subject.DoesNotExist:
+            return not_found()
+        return JsonResponse(subject_data(subject, request))
+
+
+class CourseListView(View):
+    async def get(self, request):
+        courses = [course async for course in course_queryset()]
+        return JsonResponse(
+            [course_data(course, request) for course in courses], safe=False
+        )
+
+
+class CourseDetailView(View):
+    async def get(self, request, pk):
+        try:
+            course = await course_queryset().aget(pk=pk)
+        except Course.DoesNotExist:
+            return not_found()
+        return JsonResponse(course_data(course, request))
+
+
+class CourseContentsView(View):
+    """
+    Same access rules and payload as ``CourseView.contents``: a bearer token
+    or HTTP Basic credentials of an active user, course rendered as in the
+    course list.
+    """
+
+    authentication_classes = (SignedTokenAuthentication, BasicAuthentication)
+
+    async def authenticate(self, request):
+        """
+        The user of the first credentials given, or None without any; bad
+        credentials raise ``AuthenticationFailed``
+        """
+        for authentication_class in self.authentication_classes:
+            authenticator = authentication_class()
+            result = await sync_to_async(authenticator.authenticate)(request)
+            if result is not None:
+                return result[0]
+        return None
+
+    def unauthenticated(self, request, exc):
+        response = JsonResponse({"detail": exc.detail}, status=exc.status_code)
+        # As DRF does, challenge with the first authentication class.
+        authenticator = self.authentication_classes[0]()
+        response["WWW-Authenticate"] = authenticator.authenticate_header(request)
+        return response
+
+    async def get(self, request, pk):
+        try:
+            user = await self.authenticate(request)
+        except AuthenticationFailed as exc:
+            return self.unauthenticated(request, exc)
+        if user is None:
+            return self.unauthenticated(request, NotAuthenticated())
+        try:
+            course = await course_queryset().aget(pk=pk)
+        except Course.DoesNotExist:
+            return not_found()
+        return JsonResponse(course_data(course, request))
@@ -0,0 +1,32 @@
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+from liberlearn.accounts.tokens import InvalidToken, token_user, verify_token
+from liberlearn.core.timing import phase
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    ``Authorization: Bearer <token>`` with a token from ``/api/token/``.
+    Verified with an HMAC, without touching the database.
+    """
+
+    keyword = "Bearer"
+
+    @phase("auth")
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(
+                "Invalid token header. Token string should not contain spaces."
+            )
+        try:
+            claims = verify_token(auth[1].decode())
+        except (InvalidToken, UnicodeError) as exc:
+            raise exceptions.AuthenticationFailed(str(exc) or "Invalid token.")
+        return token_user(claims), claims
+
+    def authenticate_header(self, request):
+        return f'{self.keyword} realm="api"'
@@ -1,5 +1,7 @@
 from rest_framework.permissions import SAFE_METHODS, BasePermission
 
+from ..course.enrollments import is_enrolled
+
 
 class IsAdminOrReadOnly(BasePermission):
     """
@@ -24,4 +26,15 @@ class IsAdminOrReadOnly(BasePermission):
 
 class IsEnrolled(BasePermission):
     def has_object_permission(self, request, view, obj):
-        return obj.students.filter(id=request.user.id).exists()
+        return is_enrolled(request.user, obj)
+
+
+class IsStaffOrFacility(BasePermission):
+    """Staff, and facility accounts onboarding their students"""
+
+    def has_permission(self, request, view):
+        return bool(
+            request.user
+            and request.user.is_authenticated
+            and (request.user.is_staff or request.user.is_facility)
+        )
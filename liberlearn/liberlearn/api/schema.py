@@ -0,0 +1,213 @@
+"""
+OpenAPI schema served from a prebuilt artifact.
+
+``manage.py build_schema`` (run by ``manage.py boot``) introspects the API
+once and writes the rendered YAML and JSON documents, plus gzipped copies,
+to ``OPENAPI_SCHEMA_DIR``. It only regenerates them when the serializers,
+views, URLs or models they're derived from change. The views below just
+stream those bytes back and never import drf_spectacular's generator.
+"""
+import gzip
+import hashlib
+import json
+from pathlib import Path
+
+import drf_spectacular
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from django.views import View
+from django.views.generic import TemplateView
+from drf_spectacular.settings import spectacular_settings
+
+FORMATS = {
+    "yaml": "application/vnd.oai.openapi",
+    "json": "application/vnd.oai.openapi+json",
+}
+# Everything the generated document is derived from.
+SOURCES = ["api/*.py", "urls.py", "course/models.py", "accounts/models.py"]
+META_FILE = "schema.meta.json"
+
+_artifacts = {}
+
+
+def schema_dir():
+    return Path(settings.OPENAPI_SCHEMA_DIR)
+
+
+def sources_fingerprint():
+    digest = hashlib.sha256(
+        repr(
+            (
+                drf_spectacular.__version__,
+                settings.REST_FRAMEWORK,
+                settings.SPECTACULAR_SETTINGS,
+            )
+        ).encode()
+    )
+    for path in sorted(
+        path for pattern in SOURCES for path in settings.BASE_DIR.glob(pattern)
+    ):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def read_meta():
+    try:
+        return json.loads((schema_dir() / META_FILE).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def build_schema(force=False):
+    """
+    Regenerate the schema artifacts if their sources changed. Returns
+    whether anything was written.
+    """
+    fingerprint = sources_fingerprint()
+    if not force and read_meta().get("fingerprint") == fingerprint:
+        return False
+
+    from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+
+    generator_class = spectacular_settings.DEFAULT_GENERATOR_CLASS
+    schema = generator_class().get_schema(
+        request=None, public=spectacular_settings.SERVE_PUBLIC
+    )
+    rendered = {
+        "yaml": OpenApiYamlRenderer().render(schema),
+        "json": OpenApiJsonRenderer().render(schema, renderer_context={}),
+    }
+
+    directory = schema_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    for fmt, body in rendered.items():
+        (directory / f"schema.{fmt}").write_bytes(body)
+        (directory / f"schema.{fmt}.gz").write_bytes(gzip.compress(body, mtime=0))
+    version = hashlib.sha256(rendered["json"]).hexdigest()[:16]
+    # Written last: it marks the artifacts as complete.
+    (directory / META_FILE).write_text(
+        json.dumps({"fingerprint": fingerprint, "version": version})
+    )
+    _artifacts.clear()
+    return True
+
+
+def load_schema():
+    """The prebuilt documents, read once per process"""
+    if not _artifacts:
+        meta = read_meta()
+        if not meta:
+            # Nothing was built ahead of time, e.g. a local runserver.
+            build_schema()
+            meta = read_meta()
+        directory = schema_dir()
+        _artifacts["version"] = meta["version"]
+        for fmt in FORMATS:
+            _artifacts[fmt] = (directory / f"schema.{fmt}").read_bytes()
+            _artifacts[f"{fmt}.gz"] = (directory / f"schema.{fmt}.gz").read_bytes()
+    return _artifacts
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Whether an ``Accept-Encoding`` header takes gzip, explicitly or through
+    ``*``, with a q-value above 0
+    """
+    qvalues = {}
+    for coding in accept_encoding.split(","):
+        name, *params = [part.strip() for part in coding.split(";")]
+        qvalue = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    qvalue = float(value)
+                except ValueError:
+                    qvalue = 0.0
+        qvalues[name.lower()] = qvalue
+    return qvalues.get("gzip", qvalues.get("*", 0.0)) > 0
+
+
+class SchemaView(View):
+    """
+    Serves the prebuilt schema as YAML, or JSON when asked for with
+    ``?format=json`` or an ``Accept`` header, like SpectacularAPIView did.
+
+    Requested with the current ``?v=`` version, as the docs page does, the
+    response is immutable and cacheable for a year.
+    """
+
+    def get(self, request):
+        artifacts = load_schema()
+        version = artifacts["version"]
+
+        wants_json = "json" in request.GET.get("format", "") or (
+            "json" in request.headers.get("Accept", "")
+        )
+        fmt = "json" if wants_json else "yaml"
+        accept_encoding = request.headers.get("Accept-Encoding", "")
+        encoding = "gzip" if accepts_gzip(accept_encoding) else "identity"
+        # Each format and encoding is a different representation, so caches
+        # mustn't revalidate one with the ETag of another.
+        etag = f'"{version}-{fmt}-{encoding}"'
+
+        if request.GET.get("v") == version:
+            cache_control = "public, max-age=31536000, immutable"
+        else:
+            cache_control = "public, max-age=300, must-revalidate"
+
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        # A proxy may have weakened the ETag it got.
+        if etag in {tag.removeprefix("W/") for tag in if_none_match}:
+            response = HttpResponseNotModified()
+        elif encoding == "gzip":
+            response = HttpResponse(artifacts[f"{fmt}.gz"], content_type=FORMATS[fmt])
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(artifacts[fmt], content_type=FORMATS[fmt])
+        response["ETag"] = etag
+        response["Cache-Control"] = cache_control
+        response["Content-Disposition"] = f'inline; filename="schema.{fmt}"'
+        patch_vary_headers(response, ["Accept", "Accept-Encoding"])
+        return response
+
+
+class SwaggerView(TemplateView):
+    """
+    drf_spectacular's Swagger UI page, pointed at the versioned schema URL.
+    """
+
+    template_name = "drf_spectacular/swagger_ui.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        dist = spectacular_settings.SWAGGER_UI_DIST
+        schema_url = reverse("schema")
+        version = load_schema()["version"]
+        context.update(
+            {
+                "title": spectacular_settings.TITLE,
+                "swagger_ui_css": f"{dist}/swagger-ui.css",
+                "swagger_ui_bundle": f"{dist}/swagger-ui-bundle.js",
+                "swagger_ui_standalone": (f"{dist}/swagger-ui-standalone-preset.js"),
+                "favicon_href": spectacular_settings.SWAGGER_UI_FAVICON_HREF,
+                "schema_url": f"{schema_url}?format=json&v={version}",
+                "settings": json.dumps(
+                    spectacular_settings.SWAGGER_UI_SETTINGS, indent=2
+                ),
+                "oauth2_config": json.dumps(
+                    spectacular_settings.SWAGGER_UI_OAUTH2_CONFIG, indent=2
+                ),
+                "template_name_js": "drf_spectacular/swagger_ui.js",
+                "csrf_header_name": settings.CSRF_HEADER_NAME.removeprefix(
+                    "HTTP_"
+                ).replace("_", "-"),
+                # SERVE_PUBLIC schemas don't depend on who's authenticated.
+                "schema_auth_names": "[]",
+            }
+        )
+        return context
@@ -1,9 +1,15 @@
+from django.contrib.auth import authenticate
+from django.contrib.contenttypes.models import ContentType
 from rest_framework import exceptions
 from rest_framework.serializers import (
+    BooleanField,
+    CharField,
     HyperlinkedModelSerializer,
     ModelSerializer,
     PrimaryKeyRelatedField,
+    ReadOnlyField,
     RelatedField,
+    Serializer,
     SerializerMethodField,
 )
 
@@ -14,6 +20,7 @@ from ..course.models import (
     Choice,
     Content,
     Course,
+    Image,
     Lesson,
     Question,
     Subject,
@@ -23,6 +30,7 @@ from ..course.models import (
 class SubjectSerializer(HyperlinkedModelSerializer):
     courses = SerializerMethodField()
     number_of_courses = SerializerMethodField()
+    image_srcset = ReadOnlyField()
 
     class Meta:
         model = Subject
@@ -32,6 +40,7 @@ class SubjectSerializer(HyperlinkedModelSerializer):
             "title",
             "info",
             "image_link",
+            "image_srcset",
             "intro_video",
             "slug",
             "number_of_courses",
@@ -62,7 +71,7 @@ subject title in the database"
         return instance
 
     def get_courses(self, subject: Subject):
-        courses = Course.objects.filter(subject=subject)
+        courses = subject.courses.all()
         serializer = CourseListSerializer(
             courses, many=True, context=self.context
         )
@@ -103,13 +112,16 @@ class CourseListSerializer(HyperlinkedModelSerializer):
         }
 
     def get_lessons(self, course: Course):
-        lessons = Lesson.objects.filter(course=course)
+        lessons = course.lessons.all()
         serializer = LessonWithContentsSerializer(
             lessons, many=True, context=self.context
         )
         return serializer.data
 
     def get_number_of_students(self, course: Course):
+        # Counted by the query where the view annotates it
+        if hasattr(course, "number_of_students"):
+            return course.number_of_students
         number_of_students = len(course.students.all())
         return number_of_students
 
@@ -140,17 +152,34 @@ class ItemRelatedField(RelatedField):
         return value.render()
 
 
+class ImageSerializer(ModelSerializer):
+    url = ReadOnlyField()
+    srcset = ReadOnlyField()
+
+    class Meta:
+        model = Image
+        fields = ["id", "title", "url", "srcset"]
+
+
 class ContentSerializer(ModelSerializer):
     content_type = SerializerMethodField()
+    images = SerializerMethodField()
 
     class Meta:
         model = Content
-        fields = ["id", "order", "content_type", "data"]
+        fields = ["id", "order", "content_type", "data", "images"]
 
     def get_content_type(self, content: Content):
         content_type = str(content.content_type).split()[-1]
         return content_type
 
+    def get_images(self, content: Content):
+        content_type = ContentType.objects.get_for_id(content.content_type_id)
+        if content_type.model != "image":
+            return []
+        # Prefetched by the views' course_queryset, so no query per content
+        return ImageSerializer(content.image_content.all(), many=True).data
+
 
 class LessonWithContentsSerializer(ModelSerializer):
     contents = ContentSerializer(many=True)
@@ -171,8 +200,8 @@ class CourseWithContentsSerializer(ModelSerializer):
             "title",
             "slug",
             "overview",
-            "created",
-            "owner",
+            "created_at",
+            "mentor",
             "lessons",
         ]
 
@@ -228,6 +257,30 @@ class AssessmentSerializer(ModelSerializer):
         return assessment
 
 
+class TokenObtainSerializer(Serializer):
+    username = CharField(help_text="Username or email")
+    password = CharField(style={"input_type": "password"}, write_only=True)
+
+    def validate(self, attrs):
+        user = authenticate(
+            self.context.get("request"),
+            username=attrs["username"],
+            password=attrs["password"],
+        )
+        if user is None or not user.is_active:
+            raise exceptions.ValidationError(
+                "Unable to log in with provided credentials.", code="authorization"
+            )
+        attrs["user"] = user
+        return attrs
+
+
+class TokenRevokeSerializer(Serializer):
+    all = BooleanField(
+        default=False, help_text="Revoke every token of the user, not just this one"
+    )
+
+
 # class ContentSerializer(HyperlinkedModelSerializer):
 #     item = SerializerMethodField()
 
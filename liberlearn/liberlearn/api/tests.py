@@ -0,0 +1,138 @@
+import io
+import json
+import tarfile
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from liberlearn.accounts.models import User
+from liberlearn.course import bundles
+from liberlearn.course.models import Assessment, Subject
+from liberlearn.course.tests import CatalogTestCase
+
+from .schema import accepts_gzip
+
+
+class QueryBudgetTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.subject = Subject.objects.order_by("pk").first()
+        self.assessment = Assessment.objects.order_by("pk").first()
+
+    def test_catalog(self):
+        detail_args = {
+            "subject": [self.subject.pk],
+            "course": [self.course.pk],
+            "assessment": [self.assessment.pk],
+        }
+        for name, args in detail_args.items():
+            with self.subTest(name):
+                self.assertWithinBudget(f"{name}-list", reverse(f"{name}-list"))
+                self.assertWithinBudget(
+                    f"{name}-detail", reverse(f"{name}-detail", args=args)
+                )
+
+    def test_course_contents(self):
+        self.assertWithinBudget(
+            "course-contents", reverse("course-contents", args=[self.course.pk])
+        )
+
+    def test_changes(self):
+        self.assertWithinBudget("changes", reverse("changes") + "?since=0")
+
+    def test_async_views(self):
+        for name, args in [
+            ("async-subject-list", []),
+            ("async-subject-detail", [self.subject.pk]),
+            ("async-course-list", []),
+            ("async-course-detail", [self.course.pk]),
+            ("async-course-contents", [self.course.pk]),
+        ]:
+            with self.subTest(name):
+                self.assertWithinBudget(name, reverse(name, args=args))
+
+
+class CourseContentsAuthenticationTests(CatalogTestCase):
+    def assertUnauthorized(self, url, authorization, detail):
+        response = self.client.get(url, HTTP_AUTHORIZATION=authorization)
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("WWW-Authenticate", response)
+        self.assertEqual(response.json()["detail"], detail)
+
+    def test_credentials(self):
+        for name in ["course-contents", "async-course-contents"]:
+            url = reverse(name, args=[self.course.pk])
+            with self.subTest(name):
+                self.assertUnauthorized(
+                    url,
+                    "Bearer in valid",
+                    "Invalid token header. " "Token string should not contain spaces.",
+                )
+                self.assertUnauthorized(
+                    url, "", "Authentication credentials were not provided."
+                )
+
+
+class CourseBundleTests(CatalogTestCase):
+    def setUp(self):
+        # Saving would revoke the token setUp issues within the second.
+        User.objects.filter(pk=self.student.pk).update(is_staff=True)
+        self.student.is_staff = True
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(
+            COURSE_BUNDLE_DIR=directory.name, COURSE_BUNDLES_IN_BACKGROUND=False
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.url = reverse("course-bundle", args=[self.course.pk])
+
+    def test_no_answers(self):
+        bundles.build(self.course.pk)
+        manifest = bundles.current(self.course.pk)
+        with tarfile.open(manifest["path"]) as bundle:
+            name = f"{self.course.slug}/course.json"
+            course = json.load(bundle.extractfile(name))
+        choices = [
+            choice
+            for assessment in course["assessments"]
+            for question in assessment["questions"]
+            for choice in question["choices"]
+        ]
+        self.assertTrue(choices)
+        for choice in choices:
+            self.assertNotIn("is_correct", choice)
+
+    def test_bundle_deleted_after_lookup(self):
+        bundles.build(self.course.pk)
+        manifest = bundles.current(self.course.pk)
+        manifest["path"].unlink()
+        with mock.patch.object(bundles, "current", return_value=manifest):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 202)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        content = b"".join(response.streaming_content)
+        with tarfile.open(fileobj=io.BytesIO(content)) as bundle:
+            self.assertIn(f"{self.course.slug}/course.json", bundle.getnames())
+
+
+class AcceptEncodingTests(SimpleTestCase):
+    def test_accepts_gzip(self):
+        for header, accepted in [
+            ("gzip, deflate, br", True),
+            ("GZIP;Q=0.5", True),
+            ("br, *", True),
+            ("", False),
+            ("deflate", False),
+            ("gzip;q=0", False),
+            ("gzip; q=0.0, br", False),
+            ("gzip;q=0, *", False),
+            ("*;q=0", False),
+        ]:
+            with self.subTest(header):
+                self.assertEqual(accepts_gzip(header), accepted)
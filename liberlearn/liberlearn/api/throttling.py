@@ -0,0 +1,36 @@
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+from liberlearn.core import ratelimit
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Applies the ``settings.RATE_LIMITS`` buckets of the view's
+    ``throttle_scope`` to its unsafe methods. The user bucket is keyed by
+    the authenticated user, or on login endpoints by the view's
+    ``throttle_user_field`` of the request data.
+    """
+
+    def allow_request(self, request, view):
+        scope = getattr(view, "throttle_scope", None)
+        if scope is None or request.method in SAFE_METHODS:
+            return True
+        self.wait_seconds = ratelimit.check(
+            request, scope, self.get_user_id(request, view)
+        )
+        return not self.wait_seconds
+
+    def get_user_id(self, request, view):
+        if request.user.is_authenticated:
+            return request.user.pk
+        field = getattr(view, "throttle_user_field", None)
+        if field is None or not hasattr(request.data, "get"):
+            return None
+        value = request.data.get(field)
+        if isinstance(value, str) and value:
+            return ratelimit.login_ident(value)
+        return None
+
+    def wait(self):
+        return self.wait_seconds
@@ -1,7 +1,7 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from . import views
+from . import async_views, views
 
 router = routers.DefaultRouter()
 router.register("subjects", views.SubjectView)
@@ -11,4 +11,64 @@ router.register("assessments", views.AssessmentView)
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("token/", views.TokenView.as_view(), name="token"),
+    path("token/revoke/", views.TokenRevokeView.as_view(), name="token-revoke"),
+    path(
+        "students/provision/",
+        views.StudentProvisionView.as_view(),
+        name="student-provision",
+    ),
+    path(
+        "courses/<int:pk>/bundle/",
+        views.CourseBundleView.as_view(),
+        name="course-bundle",
+    ),
+    path("changes/", views.ChangeFeedView.as_view(), name="changes"),
+    path("progress/", views.ProgressView.as_view(), name="progress"),
+    path(
+        "progress/lessons/<int:pk>/complete/",
+        views.LessonCompleteView.as_view(),
+        name="lesson-complete",
+    ),
+    path(
+        "progress/contents/<int:pk>/complete/",
+        views.ContentCompleteView.as_view(),
+        name="content-complete",
+    ),
+    path(
+        "courses/<int:pk>/player/",
+        views.LessonPlayerView.as_view(),
+        name="lesson-player",
+    ),
+    path(
+        "courses/<int:pk>/player/<int:lesson_pk>/",
+        views.LessonPlayerView.as_view(),
+        name="lesson-player-lesson",
+    ),
+    # Async read path, served without blocking a worker under ASGI
+    path(
+        "async/subjects/",
+        async_views.SubjectListView.as_view(),
+        name="async-subject-list",
+    ),
+    path(
+        "async/subjects/<int:pk>/",
+        async_views.SubjectDetailView.as_view(),
+        name="async-subject-detail",
+    ),
+    path(
+        "async/courses/",
+        async_views.CourseListView.as_view(),
+        name="async-course-list",
+    ),
+    path(
+        "async/courses/<int:pk>/",
+        async_views.CourseDetailView.as_view(),
+        name="async-course-detail",
+    ),
+    path(
+        "async/courses/<int:pk>/contents/",
+        async_views.CourseContentsView.as_view(),
+        name="async-course-contents",
+    ),
 ]
@@ -1,19 +1,34 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 
 # from drf_spectacular.utils import extend_schema
 from rest_framework import viewsets
 from rest_framework.authentication import BasicAuthentication
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.generics import GenericAPIView
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import (
     SAFE_METHODS,
+    IsAdminUser,
     IsAuthenticated,
     IsAuthenticatedOrReadOnly,
 )
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from ..course.models import Assessment, Course, Question, Subject
-from .permissions import IsAdminOrReadOnly, IsEnrolled
+from liberlearn.accounts.provisioning import ProvisioningError, provision_students
+from liberlearn.accounts.tokens import issue_token, revoke_token, revoke_user_tokens
+
+from ..core.ranges import file_response
+from ..course import bundles, changes, packages, progress
+from ..course.player import lesson_player
+from ..course.enrollments import enrolled_course_ids, is_enrolled
+from ..course.models import Assessment, Content, Course, Lesson, Question, Subject
+from .async_views import course_queryset, subject_queryset
+from .authentication import SignedTokenAuthentication
+from .permissions import IsAdminOrReadOnly, IsEnrolled, IsStaffOrFacility
 from .serializers import (
     AssessmentSerializer,
     CourseCreateSerializer,
@@ -21,7 +36,10 @@ from .serializers import (
     CourseWithContentsSerializer,
     QuestionSerializer,
     SubjectSerializer,
+    TokenObtainSerializer,
+    TokenRevokeSerializer,
 )
+from .throttling import TokenBucketThrottle
 
 
 class SubjectView(viewsets.ModelViewSet):
@@ -35,6 +53,12 @@ class SubjectView(viewsets.ModelViewSet):
     http_method_names = ["get", "post", "patch", "delete"]
     lookup_field = "pk"
 
+    def get_queryset(self):
+        # The whole tree a response shows, in one query per level
+        if self.request.method in SAFE_METHODS:
+            return subject_queryset()
+        return super().get_queryset()
+
     def get_serializer_context(self):
         return {"request": self.request}
 
@@ -48,6 +72,13 @@ class CourseView(viewsets.ModelViewSet):
     permission_classes = (IsAdminOrReadOnly,)
     http_method_names = ["get", "post", "patch", "delete"]
     lookup_field = "pk"
+    # Set per action, see TokenBucketThrottle
+    throttle_scope = None
+
+    def get_queryset(self):
+        if self.request.method in SAFE_METHODS:
+            return course_queryset()
+        return super().get_queryset()
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
@@ -60,35 +91,290 @@ class CourseView(viewsets.ModelViewSet):
     @action(
         detail=True,
         methods=["post"],
-        authentication_classes=[BasicAuthentication],
+        authentication_classes=[SignedTokenAuthentication, BasicAuthentication],
         permission_classes=[IsAuthenticated],
+        throttle_classes=[TokenBucketThrottle],
+        throttle_scope="enroll",
     )
     def enroll(self, request, *args, **kwargs):
         course = self.get_object()
-        course.students.add(request.user)
+        if not is_enrolled(request.user, course):
+            course.students.add(request.user)
         return Response({"enrolled": True})
 
     @action(
         detail=True,
         methods=["get"],
         serializer_class=CourseWithContentsSerializer,
-        authentication_classes=[BasicAuthentication],
+        authentication_classes=[SignedTokenAuthentication, BasicAuthentication],
         permission_classes=[IsAuthenticated],  # IsEnrolled
     )
     def contents(self, request, *args, **kwargs):
         return self.retrieve(request, *args, **kwargs)
 
+    @action(detail=False, methods=["get"], permission_classes=[IsAdminUser])
+    def export(self, request, *args, **kwargs):
+        """
+        Stream a gzipped package of the ``?course=<id>`` courses, or of the
+        whole catalog, for ``/courses/import/`` or ``manage.py
+        import_course``.
+        """
+        courses = Course.objects.all()
+        if "course" in request.query_params:
+            courses = courses.filter(pk__in=request.query_params.getlist("course"))
+        response = StreamingHttpResponse(
+            packages.gzip_stream(packages.export_records(courses)),
+            content_type="application/gzip",
+        )
+        response["Content-Disposition"] = 'attachment; filename="courses.jsonl.gz"'
+        return response
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        permission_classes=[IsAdminUser],
+        parser_classes=[MultiPartParser],
+    )
+    def import_package(self, request, *args, **kwargs):
+        """Import an uploaded course package ``file``"""
+        if "file" not in request.FILES:
+            raise ValidationError({"file": "A course package is required."})
+        try:
+            report = packages.import_package(request.FILES["file"])
+        except packages.PackageError as exc:
+            raise ValidationError({"file": str(exc)})
+        return Response(report)
+
 
 class CourseEnrollView(APIView):
-    authentication_classes = (BasicAuthentication,)
+    authentication_classes = (SignedTokenAuthentication, BasicAuthentication)
     permission_classes = (IsAuthenticated,)
+    throttle_classes = (TokenBucketThrottle,)
+    throttle_scope = "enroll"
 
     def post(self, request, pk, format=None):
         course = get_object_or_404(Course, pk=pk)
-        course.students.add(request.user)
+        if not is_enrolled(request.user, course):
+            course.students.add(request.user)
         return Response({"enrolled": True})
 
 
+class CourseBundleView(APIView):
+    """
+    Download the course's offline bundle, a ``.tar.gz`` of its outline,
+    rendered lessons and media. Supports ``Range`` requests, with the
+    bundle version as ETag for ``If-Range``, to resume interrupted
+    downloads. While a bundle is being built, responds 202 instead.
+    """
+
+    authentication_classes = (SignedTokenAuthentication, BasicAuthentication)
+    permission_classes = (IsStaffOrFacility,)
+
+    def get(self, request, pk, format=None):
+        manifest = bundles.current(pk)
+        if manifest is None:
+            return self.building(pk)
+        try:
+            return file_response(
+                request,
+                manifest["path"],
+                manifest["version"],
+                content_type="application/gzip",
+                filename=f"{manifest['slug']}-{manifest['version']}.tar.gz",
+            )
+        except FileNotFoundError:
+            # Replaced by a newer build since, or deleted with the course
+            return self.building(pk)
+
+    def building(self, pk):
+        get_object_or_404(Course, pk=pk)
+        bundles.schedule(pk)
+        return Response(
+            {"detail": "The bundle is being built, try again shortly."},
+            status=202,
+            headers={"Retry-After": "30"},
+        )
+
+
+class ChangeFeedView(APIView):
+    """
+    The course rows created, updated or deleted after version ``?since=``,
+    oldest first, optionally only of the ``?course=`` ids. Deleted rows
+    come as tombstones without fields. Ask again from ``next`` while
+    ``more`` is true. Without ``since``, only the version to start from.
+    Staff get every course, others those they are enrolled in or teach.
+    """
+
+    authentication_classes = (SignedTokenAuthentication, BasicAuthentication)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, format=None):
+        if "since" not in request.query_params:
+            return Response({"changes": [], "next": changes.latest(), "more": False})
+        try:
+            since = int(request.query_params["since"])
+            courses = [int(pk) for pk in request.query_params.getlist("course")]
+            limit = int(request.query_params.get("limit", changes.PAGE_SIZE))
+        except ValueError:
+            raise ValidationError("since, course and limit must be integers.")
+        limit = max(1, min(limit, changes.PAGE_SIZE))
+        courses = courses or None
+        if not request.user.is_staff:
+            visible = enrolled_course_ids(request.user) | set(
+                Course.objects.filter(mentor=request.user).values_list("pk", flat=True)
+            )
+            courses = visible if courses is None else visible & set(courses)
+        return Response(changes.feed(since, courses, limit))
+
+
+class ProgressView(APIView):
+    """The completion of every course the student is enrolled in"""
+
+    authentication_classes = (SignedTokenAuthentication, BasicAuthentication)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, format=None):
+        return Response(
+            [
+                {
+                    "course": course.id,
+                    "title": course.title,
+                    "slug": course.slug,
+                    "lessons": course.lesson_count,
+                    "lessons_completed": course.lessons_completed,
+                    "percent": progress.percent(
+                        course.lessons_completed, course.lesson_count
+                    ),
+                }
+                for course in progress.dashboard(request.user)
+            ]
+        )
+
+
+class LessonCompleteView(APIView):
+    authentication_classes = (SignedTokenAuthentication, BasicAuthentication)
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, pk, format=None):
+        lesson = get_object_or_404(Lesson, pk=pk)
+        if not is_enrolled(request.user, lesson.course_id):
+            raise PermissionDenied("You are not enrolled in this course.")
+        return Response(
+            progress.summary(progress.complete_lesson(request.user, lesson))
+        )
+
+
+class ContentCompleteView(APIView):
+    authentication_classes = (SignedTokenAuthentication, BasicAuthentication)
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, pk, format=None):
+        content = get_object_or_404(Content.objects.select_related("lesson"), pk=pk)
+        if not is_enrolled(request.user, content.lesson.course_id):
+            raise PermissionDenied("You are not enrolled in this course.")
+        try:
+            completed = progress.complete_content(request.user, content)
+        except ValueError as exc:
+            raise ValidationError(str(exc))
+        return Response(progress.summary(completed))
+
+
+class LessonPlayerView(APIView):
+    """
+    A lesson of an enrolled course with its rendered contents, the course
+    outline with the previous and next lessons, and the student's progress.
+    Without a lesson, the first one not completed yet.
+    """
+
+    authentication_classes = (SignedTokenAuthentication, BasicAuthentication)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, pk, lesson_pk=None, format=None):
+        if not is_enrolled(request.user, pk):
+            raise PermissionDenied("You are not enrolled in this course.")
+        return Response(lesson_player(request.user, pk, lesson_pk))
+
+
+class TokenView(GenericAPIView):
+    """
+    Exchange a username (or email) and password for a signed access token,
+    to send as ``Authorization: Bearer <token>`` until it expires.
+    """
+
+    serializer_class = TokenObtainSerializer
+    authentication_classes = ()
+    permission_classes = ()
+    throttle_classes = (TokenBucketThrottle,)
+    throttle_scope = "login"
+    # No one is authenticated here, so the user bucket goes by the username
+    # tried, as for the login form.
+    throttle_user_field = "username"
+
+    def post(self, request, format=None):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token, claims = issue_token(serializer.validated_data["user"])
+        return Response(
+            {
+                "token": token,
+                "token_type": "Bearer",
+                "expires_in": claims["exp"] - claims["iat"],
+            }
+        )
+
+
+class TokenRevokeView(GenericAPIView):
+    """
+    Revoke the token the request is made with, or with ``{"all": true}``
+    every token issued to its user.
+    """
+
+    serializer_class = TokenRevokeSerializer
+    authentication_classes = (SignedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, format=None):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if serializer.validated_data["all"]:
+            revoke_user_tokens(request.user.pk)
+        else:
+            revoke_token(request.auth)
+        return Response({"revoked": True})
+
+
+class StudentProvisionView(APIView):
+    """
+    Create student accounts in bulk from an uploaded CSV ``file`` with the
+    columns username, email, password, first_name, last_name, batch and
+    roll_no. Responds with a report per row, including the passwords
+    generated for rows that had none. Files of more than PROVISION_MAX_ROWS
+    rows are refused, as hashing their passwords would outlast the request.
+    """
+
+    authentication_classes = (SignedTokenAuthentication, BasicAuthentication)
+    permission_classes = (IsStaffOrFacility,)
+    parser_classes = (MultiPartParser,)
+
+    def post(self, request, format=None):
+        if "file" not in request.FILES:
+            raise ValidationError({"file": "A CSV file is required."})
+        try:
+            report = provision_students(
+                request.FILES["file"],
+                # Forking a serving worker isn't safe.
+                processes=1,
+                max_rows=settings.PROVISION_MAX_ROWS,
+            )
+        except ProvisioningError as exc:
+            raise ValidationError({"file": str(exc)})
+        created = sum(entry["status"] == "created" for entry in report)
+        return Response(
+            {"created": created, "failed": len(report) - created, "rows": report}
+        )
+
+
 # class LessonView(viewsets.ModelViewSet):
 #     """
 #     A simple viewset for viewing all Lessons
@@ -109,9 +395,11 @@ class CourseEnrollView(APIView):
 
 
 class AssessmentView(viewsets.ModelViewSet):
-    queryset = Assessment.objects.all()
+    queryset = Assessment.objects.prefetch_related("questions__choices")
     serializer_class = AssessmentSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    throttle_classes = (TokenBucketThrottle,)
+    throttle_scope = "assessments"
     http_method_names = ["get", "post", "patch", "delete"]
     lookup_field = "pk"
 
@@ -0,0 +1,37 @@
+"""
+Version counters for invalidating groups of cache entries.
+
+Entries derived from some data are stored under a key that includes the
+version of that data; bumping the version on change makes every older entry
+unreachable at once, and a slow reader can't write a stale value back under
+the new version.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def _new_version():
+    # Time based rather than 1, so a version evicted from the cache can't
+    # bring back entries stored under an earlier one.
+    return time.time_ns()
+
+
+def get_versions(*keys):
+    """The current value of each version key, in order"""
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            version = _new_version()
+            if not cache.add(key, version, None):
+                version = cache.get(key, version)
+            versions[key] = version
+    return [versions[key] for key in keys]
+
+
+def bump_versions(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), None)
@@ -0,0 +1,41 @@
+"""
+Cache backends that report their reads to the request timings, see
+liberlearn.core.timing.
+"""
+import time
+
+from django.core.cache.backends import locmem
+from django_redis import cache as django_redis
+
+from .timing import current, record_cache_read
+
+_missing = object()
+
+
+class InstrumentedCacheMixin:
+    def get(self, key, default=None, *args, **kwargs):
+        if current() is None:
+            return super().get(key, default, *args, **kwargs)
+        started = time.perf_counter()
+        value = super().get(key, _missing, *args, **kwargs)
+        hit = value is not _missing
+        record_cache_read(time.perf_counter() - started, hit, not hit)
+        return value if hit else default
+
+
+class LocMemCache(InstrumentedCacheMixin, locmem.LocMemCache):
+    # get_many() goes through get() here.
+    pass
+
+
+class RedisCache(InstrumentedCacheMixin, django_redis.RedisCache):
+    def get_many(self, keys, *args, **kwargs):
+        if current() is None:
+            return super().get_many(keys, *args, **kwargs)
+        keys = list(keys)
+        started = time.perf_counter()
+        values = super().get_many(keys, *args, **kwargs)
+        record_cache_read(
+            time.perf_counter() - started, len(values), len(keys) - len(values)
+        )
+        return values
@@ -0,0 +1,99 @@
+"""
+SQLite backend for single-box deployments, where several gunicorn workers
+share one database file.
+
+Every new connection is switched to WAL with relaxed syncing and a larger
+page cache, transactions take the write lock up front (``BEGIN IMMEDIATE``)
+and statements that still hit ``database is locked`` outside a transaction
+are retried with jittered exponential backoff.
+"""
+import random
+import time
+
+from django.db.backends.sqlite3 import base
+from django.utils.asyncio import async_unsafe
+
+PRAGMA_DEFAULTS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "mmap_size": 128 * 1024 * 1024,
+    # Negative values are in KiB, i.e. a 64 MiB page cache.
+    "cache_size": -64 * 1024,
+    "busy_timeout": 5000,
+}
+RETRY_DEFAULTS = {"lock_retries": 5, "lock_backoff": 0.05}
+
+
+def is_lock_error(exc):
+    message = str(exc).lower()
+    return "database is locked" in message or "database is busy" in message
+
+
+class SQLiteCursorWrapper(base.SQLiteCursorWrapper):
+    lock_retries = RETRY_DEFAULTS["lock_retries"]
+    lock_backoff = RETRY_DEFAULTS["lock_backoff"]
+
+    def _retry(self, method, *args):
+        attempt = 0
+        while True:
+            try:
+                return method(*args)
+            except base.Database.OperationalError as exc:
+                # Inside a transaction the statement is not safe to replay
+                # on its own; let the caller's atomic block fail instead.
+                if (
+                    attempt >= self.lock_retries
+                    or self.connection.in_transaction
+                    or not is_lock_error(exc)
+                ):
+                    raise
+                time.sleep(self.lock_backoff * 2**attempt * random.uniform(0.5, 1.5))
+                attempt += 1
+
+    def execute(self, query, params=None):
+        return self._retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        # A generator can't be replayed, so materialize it before retrying.
+        return self._retry(super().executemany, query, list(param_list))
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, settings_dict, *args, **kwargs):
+        super().__init__(settings_dict, *args, **kwargs)
+        options = self.settings_dict["OPTIONS"]
+        self.pragmas = {
+            name: options.get(name, default)
+            for name, default in PRAGMA_DEFAULTS.items()
+        }
+        self.lock_retries = options.get("lock_retries", RETRY_DEFAULTS["lock_retries"])
+        self.lock_backoff = options.get("lock_backoff", RETRY_DEFAULTS["lock_backoff"])
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        for name in (*PRAGMA_DEFAULTS, *RETRY_DEFAULTS):
+            kwargs.pop(name, None)
+        return kwargs
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        # busy_timeout goes first so that switching the journal mode also
+        # waits for other workers instead of failing straight away.
+        conn.execute(f"PRAGMA busy_timeout = {int(self.pragmas['busy_timeout'])}")
+        for name, value in self.pragmas.items():
+            if name != "busy_timeout" and value is not None:
+                conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=SQLiteCursorWrapper)
+        cursor.lock_retries = self.lock_retries
+        cursor.lock_backoff = self.lock_backoff
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        # A deferred BEGIN upgrades to a write lock mid-transaction, which
+        # SQLite answers with an immediate SQLITE_BUSY that busy_timeout
+        # can't help with. Taking the lock up front makes writers queue.
+        self.cursor().execute("BEGIN IMMEDIATE")
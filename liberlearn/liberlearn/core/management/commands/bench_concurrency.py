@@ -0,0 +1,134 @@
+import asyncio
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+SERVERS = {
+    "wsgi": {
+        "app": "liberlearn.wsgi:application",
+        "args": [],
+        "path": "/api/subjects/",
+    },
+    "asgi": {
+        "app": "liberlearn.asgi:application",
+        "args": ["-c", "gunicorn_asgi.conf.py"],
+        "path": "/api/async/subjects/",
+    },
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the current WSGI deployment with the ASGI one under many "
+        "concurrent slow-network clients"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=500)
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument(
+            "--trickle",
+            type=float,
+            default=2.0,
+            help="Seconds each client takes to send its request",
+        )
+        parser.add_argument("--timeout", type=float, default=60)
+        parser.add_argument(
+            "--server", choices=list(SERVERS), action="append", default=None
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{options['clients']} clients, {options['workers']} workers, "
+            f"{options['trickle']}s trickle"
+        )
+        for name in options["server"] or SERVERS:
+            result = self.run(SERVERS[name], options)
+            self.stdout.write(
+                f"{name:>5}: {result['ok']} ok, {result['failed']} failed in "
+                f"{result['elapsed']:.1f}s  p50 {result['p50']:.0f} ms  "
+                f"p99 {result['p99']:.0f} ms"
+            )
+
+    def run(self, server, options):
+        port = free_port()
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "gunicorn",
+                server["app"],
+                *server["args"],
+                f"--bind=127.0.0.1:{port}",
+                f"--workers={options['workers']}",
+                "--log-level=warning",
+            ],
+            cwd=settings.BASE_DIR.parent,
+        )
+        try:
+            self.wait_for(port)
+            return asyncio.run(self.storm(port, server["path"], options))
+        finally:
+            process.terminate()
+            process.wait()
+
+    def wait_for(self, port, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", port), 0.5).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError(f"server on port {port} did not start")
+
+    async def storm(self, port, path, options):
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(
+                    self.slow_client(port, path, options["trickle"]), options["timeout"]
+                )
+                for _ in range(options["clients"])
+            ),
+            return_exceptions=True,
+        )
+        elapsed = time.perf_counter() - started
+        latencies = sorted(r for r in results if isinstance(r, float))
+        quantiles = statistics.quantiles(latencies or [0, 0], n=100)
+        return {
+            "ok": len(latencies),
+            "failed": len(results) - len(latencies),
+            "elapsed": elapsed,
+            "p50": quantiles[49],
+            "p99": quantiles[98],
+        }
+
+    async def slow_client(self, port, path, trickle, pieces=10):
+        started = time.perf_counter()
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        request = (
+            f"GET {path} HTTP/1.1\r\nHost: localhost\r\n" "Connection: close\r\n\r\n"
+        ).encode()
+        # Dribble the request out the way a congested mobile link would.
+        size = -(-len(request) // pieces)
+        for offset in range(0, len(request), size):
+            writer.write(request[offset : offset + size])
+            await writer.drain()
+            await asyncio.sleep(trickle / pieces)
+        response = await reader.read()
+        writer.close()
+        if not response.startswith(b"HTTP/1.1 200"):
+            raise RuntimeError(response[:40])
+        return (time.perf_counter() - started) * 1000
@@ -0,0 +1,249 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+
+from liberlearn.accounts.models import User
+from liberlearn.accounts.tokens import issue_token
+from liberlearn.core.sql import QueryRecorder
+from liberlearn.course.models import Assessment, Content, Course, Lesson, Subject
+
+HOST = "localhost"
+# name -> (path, who makes the request). Paths are filled in from sample
+# objects of the catalog; only GETs, so runs leave the data as it was.
+ENDPOINTS = {
+    "api-subject-list": ("/api/subjects/", None),
+    "api-subject-detail": ("/api/subjects/{subject}/", None),
+    "api-course-list": ("/api/courses/", None),
+    "api-course-detail": ("/api/courses/{course}/", None),
+    "api-course-contents": ("/api/courses/{course}/contents/", "student"),
+    "api-assessment-list": ("/api/assessments/", None),
+    "api-assessment-detail": ("/api/assessments/{assessment}/", None),
+    "async-subject-list": ("/api/async/subjects/", None),
+    "async-subject-detail": ("/api/async/subjects/{subject}/", None),
+    "async-course-list": ("/api/async/courses/", None),
+    "async-course-detail": ("/api/async/courses/{course}/", None),
+    "async-course-contents": ("/api/async/courses/{course}/contents/", "student"),
+    "schema": ("/api/schema/", None),
+    "schema-docs": ("/api/schema/docs", None),
+    "course-list-subject": ("/courses/subject/{subject_slug}/", None),
+    "student-course-list": ("/students/courses/", "student"),
+    "student-course-detail": ("/students/course/{course}/", "student"),
+    "student-course-lesson": ("/students/course/{course}/{lesson}/", "student"),
+    "manage-course-lessons": ("/courses/{course}/lesson/", "staff"),
+    "manage-lesson-contents": ("/courses/lesson/{lesson}/", "staff"),
+}
+
+
+def summarize(latencies):
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "p50": quantiles[49],
+        "p90": quantiles[89],
+        "p99": quantiles[98],
+        "mean": statistics.fmean(latencies),
+        "min": min(latencies),
+        "max": max(latencies),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure latency percentiles, query counts and allocations of the "
+        "API and template endpoints against the current database, in "
+        "process, and write them as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests", type=int, default=50, help="Timed requests per endpoint"
+        )
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--max-time",
+            type=float,
+            default=30,
+            help="Stop timing an endpoint after this many seconds",
+        )
+        parser.add_argument(
+            "--only",
+            action="append",
+            choices=list(ENDPOINTS),
+            help="Benchmark only this endpoint; can be repeated",
+        )
+        parser.add_argument("-o", "--output", help="Write the results here")
+        parser.add_argument(
+            "--compare", help="Print the changes from an earlier output file"
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 2:
+            raise CommandError("--requests must be at least 2")
+        samples = self.samples()
+        clients = self.clients()
+
+        results = {}
+        for name in options["only"] or ENDPOINTS:
+            path, auth = ENDPOINTS[name]
+            if auth not in clients:
+                self.stderr.write(f"{name}: skipped, no {auth} user")
+                continue
+            results[name] = self.bench(clients[auth], path.format(**samples), options)
+            self.report(name, results[name])
+
+        data = {"meta": self.meta(), "results": results}
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(data, file, indent=2)
+        if options["compare"]:
+            with open(options["compare"]) as file:
+                self.compare(json.load(file)["results"], results)
+
+    def samples(self):
+        # A course with lessons and students, so every endpoint has
+        # something to show.
+        course = (
+            Course.objects.filter(lessons__isnull=False, students__isnull=False)
+            .select_related("subject")
+            .order_by("pk")
+            .first()
+        )
+        if course is None:
+            raise CommandError(
+                "No course with lessons and students; fill the database "
+                "with generate_catalog first"
+            )
+        self.student = course.students.order_by("pk").first()
+        self.staff = User.objects.filter(is_superuser=True).order_by("pk").first()
+        assessment = Assessment.objects.filter(course=course).first()
+        return {
+            "course": course.pk,
+            "subject": course.subject_id,
+            "subject_slug": course.subject.slug,
+            "lesson": course.lessons.order_by("order").first().pk,
+            "assessment": assessment.pk if assessment else 0,
+        }
+
+    def clients(self):
+        # Broken endpoints are reported with their status, not raised.
+        clients = {None: Client(HTTP_HOST=HOST, raise_request_exception=False)}
+        for auth, user in (("student", self.student), ("staff", self.staff)):
+            if user is None:
+                continue
+            # Logged in for the template views, a bearer token for the API.
+            token, _ = issue_token(user)
+            client = Client(
+                HTTP_HOST=HOST,
+                HTTP_AUTHORIZATION=f"Bearer {token}",
+                raise_request_exception=False,
+            )
+            client.force_login(user)
+            clients[auth] = client
+        return clients
+
+    def bench(self, client, path, options):
+        for _ in range(options["warmup"]):
+            client.get(path)
+
+        latencies = []
+        deadline = time.perf_counter() + options["max_time"]
+        for _ in range(options["requests"]):
+            started = time.perf_counter()
+            client.get(path)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if started > deadline and len(latencies) >= 2:
+                break
+
+        # Counted with a wrapper rather than connection.queries, which
+        # only keeps the last 9000.
+        queries = QueryRecorder()
+        with connection.execute_wrapper(queries):
+            response = client.get(path)
+
+        # Its own pass: tracing slows everything down too much to time.
+        peaks, retained = [], []
+        tracemalloc.start()
+        try:
+            for _ in range(min(len(latencies), 5)):
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                client.get(path)
+                current, peak = tracemalloc.get_traced_memory()
+                peaks.append(peak - before)
+                retained.append(current - before)
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "path": path,
+            "status": response.status_code,
+            "requests": len(latencies),
+            "latency_ms": summarize(latencies),
+            "queries": queries.count,
+            "query_ms": queries.time * 1000,
+            "duplicated_queries": len(queries.duplicates()),
+            "peak_bytes": statistics.median(peaks),
+            "retained_bytes": statistics.median(retained),
+        }
+
+    def report(self, name, result):
+        latency = result["latency_ms"]
+        line = (
+            f"{name:<24} {result['status']}  p50 {latency['p50']:7.2f} ms  "
+            f"p99 {latency['p99']:7.2f} ms  {result['queries']:5} queries  "
+            f"peak {result['peak_bytes'] / 1024:8.1f} KiB"
+        )
+        if result["status"] >= 400:
+            self.stdout.write(self.style.WARNING(line))
+        else:
+            self.stdout.write(line)
+
+    def meta(self):
+        try:
+            revision = subprocess.run(
+                ["git", "rev-parse", "HEAD"],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+            ).stdout.strip()
+        except OSError:
+            revision = ""
+        return {
+            "revision": revision,
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "cache": settings.CACHES["default"]["BACKEND"],
+            "catalog": {
+                model._meta.model_name: model.objects.count()
+                for model in (Subject, Course, Lesson, Content, User)
+            },
+        }
+
+    def compare(self, old, new):
+        self.stdout.write("\nchange from the earlier run (p50, queries):")
+        for name, result in new.items():
+            if name not in old:
+                continue
+            before = old[name]["latency_ms"]["p50"]
+            after = result["latency_ms"]["p50"]
+            change = (after - before) / before * 100 if before else 0
+            line = (
+                f"{name:<24} {before:7.2f} -> {after:7.2f} ms "
+                f"({change:+.0f}%)  {old[name]['queries']:5} -> "
+                f"{result['queries']:5} queries"
+            )
+            if change > 10 or result["queries"] > old[name]["queries"]:
+                self.stdout.write(self.style.WARNING(line))
+            else:
+                self.stdout.write(line)
@@ -0,0 +1,160 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError
+
+from liberlearn.accounts.models import User
+from liberlearn.core.db.backends.sqlite3.base import is_lock_error
+from liberlearn.course.models import Course, Subject
+
+PROFILES = (("stock", "False"), ("profile", "True"))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare sustained request throughput of concurrent workers on a "
+        "SQLite file with and without the SQLite profile"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument(
+            "--duration", type=float, default=10, help="Seconds per run"
+        )
+        parser.add_argument(
+            "--write-ratio",
+            type=float,
+            default=0.3,
+            help="Share of requests that enroll a student",
+        )
+        parser.add_argument("--courses", type=int, default=50)
+        parser.add_argument("--students", type=int, default=2000)
+        # Internal modes used by the subprocesses of a benchmark run.
+        parser.add_argument("--seed", action="store_true", help=argparse.SUPPRESS)
+        parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+        parser.add_argument("--start-at", type=float, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options["seed"]:
+            return self.seed(options)
+        if options["worker"]:
+            return self.work(options)
+
+        self.stdout.write(
+            f"{options['workers']} workers, {options['duration']}s, "
+            f"write ratio {options['write_ratio']}"
+        )
+        for label, flag in PROFILES:
+            result = self.run(flag, options)
+            self.stdout.write(
+                f"{label:>8}: {result['rps']:8.1f} req/s  "
+                f"p50 {result['p50']:6.1f} ms  p99 {result['p99']:7.1f} ms  "
+                f"lock errors {result['errors']}"
+            )
+
+    def manage(self, env, *args, **kwargs):
+        manage_py = settings.BASE_DIR.parent / "manage.py"
+        return subprocess.Popen(
+            [sys.executable, str(manage_py), *args], env=env, **kwargs
+        )
+
+    def run(self, flag, options):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {
+                **os.environ,
+                "DATABASE_URL": f"sqlite:///{tmp}/bench.sqlite3",
+                "DJANGO_SQLITE_PROFILE": flag,
+            }
+            common = [
+                f"--courses={options['courses']}",
+                f"--students={options['students']}",
+            ]
+            for args in (
+                ["migrate", "--no-input", "-v", "0"],
+                ["bench_sqlite", "--seed", *common],
+            ):
+                if self.manage(env, *args).wait():
+                    raise RuntimeError(f"{args[0]} failed")
+
+            # Give every worker time to boot Django so they all start
+            # hammering the file at the same moment.
+            start_at = time.time() + 5
+            workers = [
+                self.manage(
+                    env,
+                    "bench_sqlite",
+                    "--worker",
+                    f"--start-at={start_at}",
+                    f"--duration={options['duration']}",
+                    f"--write-ratio={options['write_ratio']}",
+                    *common,
+                    stdout=subprocess.PIPE,
+                )
+                for _ in range(options["workers"])
+            ]
+            reports = [json.loads(w.communicate()[0]) for w in workers]
+
+        latencies = sorted(
+            latency for report in reports for latency in report["latencies"]
+        )
+        quantiles = statistics.quantiles(latencies or [0, 0], n=100)
+        return {
+            "rps": len(latencies) / options["duration"],
+            "p50": quantiles[49],
+            "p99": quantiles[98],
+            "errors": sum(report["errors"] for report in reports),
+        }
+
+    def seed(self, options):
+        subject = Subject.objects.create(title="Benchmark", slug="benchmark")
+        mentor = User.objects.create(username="bench-mentor", role="mentor")
+        User.objects.bulk_create(
+            User(username=f"bench-student-{i}", role="student", password="!")
+            for i in range(options["students"])
+        )
+        Course.objects.bulk_create(
+            Course(
+                mentor=mentor,
+                subject=subject,
+                title=f"Course {i}",
+                slug=f"course-{i}",
+                overview="Benchmark course",
+            )
+            for i in range(options["courses"])
+        )
+
+    def work(self, options):
+        course_ids = list(Course.objects.values_list("id", flat=True))
+        student_ids = list(
+            User.objects.filter(role="student").values_list("id", flat=True)
+        )
+        time.sleep(max(0, options["start_at"] - time.time()))
+
+        latencies, errors = [], 0
+        deadline = time.monotonic() + options["duration"]
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                # A catalog page read, and for some requests an enrollment,
+                # mirroring CourseEnrollView.
+                list(Course.objects.select_related("subject")[:20])
+                if random.random() < options["write_ratio"]:
+                    course = Course.objects.get(pk=random.choice(course_ids))
+                    course.students.add(random.choice(student_ids))
+            except OperationalError as exc:
+                if not is_lock_error(exc):
+                    raise
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        self.stdout.write(json.dumps({"latencies": latencies, "errors": errors}))
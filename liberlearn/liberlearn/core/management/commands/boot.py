@@ -0,0 +1,123 @@
+import hashlib
+import os
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import get_finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+from liberlearn.api import schema
+from liberlearn.core.models import BootStep
+
+# The same ignore patterns collectstatic uses by default.
+STATIC_IGNORE_PATTERNS = ["CVS", ".*", "*~"]
+CHUNK_SIZE = 64 * 1024
+
+
+def unapplied_migrations():
+    """Whether the database lacks any migration on disk"""
+    connection = connections[DEFAULT_DB_ALIAS]
+    connection.prepare_database()
+    executor = MigrationExecutor(connection)
+    return bool(executor.migration_plan(executor.loader.graph.leaf_nodes()))
+
+
+def schema_fingerprint():
+    return f"{schema.sources_fingerprint()}:{bool(schema.read_meta())}"
+
+
+def static_fingerprint():
+    """Hash of the static sources plus whether a collected copy exists"""
+    manifest = Path(settings.STATIC_ROOT) / "staticfiles.json"
+    # By content, as a fresh checkout or image gives every file a new mtime.
+    files = {}
+    for finder in get_finders():
+        for path, storage in finder.list(STATIC_IGNORE_PATTERNS):
+            # The first finder to list a path wins, as in collectstatic.
+            files.setdefault(path, storage)
+    digest = hashlib.sha256(str(manifest.exists()).encode())
+    for path in sorted(files):
+        file_digest = hashlib.sha256()
+        with files[path].open(path) as file:
+            for chunk in iter(partial(file.read, CHUNK_SIZE), b""):
+                file_digest.update(chunk)
+        digest.update(f"{path}:{file_digest.hexdigest()}".encode())
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = (
+        "Run migrate if the database lacks migrations, and collectstatic and "
+        "build_schema only when their sources changed since they last ran, "
+        "then start gunicorn with the app preloaded"
+    )
+    # Run after migrate, whose state is the database's own
+    steps = [
+        ("collectstatic", static_fingerprint, {"interactive": False}),
+        ("build_schema", schema_fingerprint, {}),
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Run every step even if its fingerprint is unchanged",
+        )
+        parser.add_argument(
+            "--no-serve",
+            action="store_true",
+            help="Stop after the build steps instead of starting gunicorn",
+        )
+
+    def report(self, name, outcome, started):
+        self.stdout.write(
+            f"boot: {name} {outcome} ({time.perf_counter() - started:.2f}s)"
+        )
+
+    def handle(self, *args, **options):
+        started = float(
+            os.environ.setdefault("LIBERLEARN_BOOT_STARTED", str(time.time()))
+        )
+        step_started = time.perf_counter()
+        if options["force"] or unapplied_migrations():
+            call_command("migrate", verbosity=options["verbosity"], interactive=False)
+            outcome = "ran"
+        else:
+            outcome = "skipped, up to date"
+        self.report("migrate", outcome, step_started)
+
+        state = dict(BootStep.objects.values_list("name", "fingerprint"))
+        for name, fingerprint, command_options in self.steps:
+            step_started = time.perf_counter()
+            current = fingerprint()
+            if options["force"] or state.get(name) != current:
+                call_command(name, verbosity=options["verbosity"], **command_options)
+                # Taken again since the step can change its own inputs (the
+                # collected manifest), and saved right away so a failure in a
+                # later step doesn't make the next boot repeat this one.
+                BootStep.objects.update_or_create(
+                    name=name, defaults={"fingerprint": fingerprint()}
+                )
+                outcome = "ran"
+            else:
+                outcome = "skipped, unchanged"
+            self.report(name, outcome, step_started)
+        self.stdout.write(
+            f"boot: build steps done {time.time() - started:.2f}s after boot"
+        )
+
+        if options["no_serve"]:
+            return
+        sys.stdout.flush()
+        os.chdir(settings.BASE_DIR.parent)
+        # gunicorn picks up gunicorn.conf.py from the working directory.
+        os.execv(
+            sys.executable,
+            [sys.executable, "-m", "gunicorn", "liberlearn.wsgi:application"],
+        )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from liberlearn.api.schema import build_schema, schema_dir
+
+
+class Command(BaseCommand):
+    help = (
+        "Prebuild the OpenAPI schema served at /api/schema/, if the API it "
+        "describes changed since the last build"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate even if the sources are unchanged",
+        )
+
+    def handle(self, *args, **options):
+        if build_schema(force=options["force"]):
+            self.stdout.write(self.style.SUCCESS(f"Schema written to {schema_dir()}"))
+        else:
+            self.stdout.write("Schema is up to date")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from liberlearn.core.profiling import issue_token
+
+
+class Command(BaseCommand):
+    help = (
+        "Print an X-Profile-Token header value that makes requests run "
+        "under the profiler"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--minutes", type=int, default=30, help="How long the token is valid"
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(issue_token(options["minutes"] * 60))
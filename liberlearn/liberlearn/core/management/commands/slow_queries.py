@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from liberlearn.core.slowqueries import read_log
+
+
+class Command(BaseCommand):
+    help = (
+        "Rank the statements of the slow-query log by the total time spent " "in them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=10)
+        parser.add_argument(
+            "--log", help=f"Defaults to SLOW_QUERY_LOG, {settings.SLOW_QUERY_LOG}"
+        )
+        parser.add_argument(
+            "--clear", action="store_true", help="Empty the log afterwards"
+        )
+
+    def handle(self, *args, **options):
+        offenders = {}
+        for entry in read_log(options["log"]):
+            offender = offenders.setdefault(
+                entry["fingerprint"], {"count": 0, "total": 0, "max": 0, "views": set()}
+            )
+            offender["count"] += 1
+            offender["total"] += entry["ms"]
+            offender["max"] = max(offender["max"], entry["ms"])
+            offender["views"].add(entry["view"] or "-")
+            # The latest example of each, preferring one with a plan.
+            if entry.get("plan") or not offender.get("plan"):
+                offender.update(
+                    sql=entry["sql"], stack=entry["stack"], plan=entry.get("plan")
+                )
+
+        if not offenders:
+            self.stdout.write("No slow queries logged.")
+        ranked = sorted(
+            offenders.items(), key=lambda item: item[1]["total"], reverse=True
+        )
+        for rank, (fingerprint, offender) in enumerate(ranked[: options["limit"]], 1):
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(
+                    f"{rank}. {offender['total'] / 1000:.2f}s total, "
+                    f"{offender['count']} x, "
+                    f"mean {offender['total'] / offender['count']:.0f} ms, "
+                    f"max {offender['max']:.0f} ms, "
+                    f"views: {', '.join(sorted(offender['views']))}"
+                )
+            )
+            self.stdout.write(f"   {fingerprint}")
+            for frame in offender["stack"]:
+                self.stdout.write(f"     at {frame}")
+            for line in offender["plan"] or []:
+                self.stdout.write(f"     plan: {line}")
+
+        if options["clear"]:
+            open(options["log"] or settings.SLOW_QUERY_LOG, "w").close()
@@ -0,0 +1,140 @@
+"""
+Finding out what makes a worker's memory grow.
+
+tracemalloc records where every allocation was made, at a price in speed
+and memory, so it is off until asked for: by MEMORY_TRACE_FRAMES when the
+worker starts, through the staff endpoint /diagnostics/memory, or by
+sending the worker SIGUSR2. Tracing starts with a baseline snapshot; each
+report then lists the allocation sites that grew the most since.
+
+Separately, workers whose resident memory passes MEMORY_CEILING_MB are
+recycled after the request they are serving, see gunicorn.conf.py.
+"""
+import logging
+import os
+import resource
+import signal
+import time
+import tracemalloc
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Allocation sites listed in a report
+TOP = 25
+GROUPINGS = ("lineno", "filename", "traceback")
+
+_baseline = None
+
+
+def resident_memory():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Peak rather than current, in KiB on Linux and bytes on macOS.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def over_ceiling():
+    ceiling = settings.MEMORY_CEILING_MB
+    return bool(ceiling) and resident_memory() > ceiling * 1024 * 1024
+
+
+def snapshot():
+    # The bookkeeping of tracemalloc, this module and imports isn't the
+    # app's growth.
+    return tracemalloc.take_snapshot().filter_traces(
+        [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ]
+    )
+
+
+def start(frames=None):
+    """Start tracing if needed, and take a new baseline"""
+    global _baseline
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames or settings.MEMORY_TRACE_FRAMES or 1)
+    _baseline = snapshot()
+
+
+def stop():
+    global _baseline
+    tracemalloc.stop()
+    _baseline = None
+
+
+def report(top=TOP, group_by="lineno"):
+    """This worker's memory, with the sites that grew most if tracing"""
+    data = {
+        "pid": os.getpid(),
+        "rss_bytes": resident_memory(),
+        "tracing": tracemalloc.is_tracing(),
+    }
+    if _baseline is None or not tracemalloc.is_tracing():
+        return data
+    current, peak = tracemalloc.get_traced_memory()
+    stats = snapshot().compare_to(_baseline, group_by)
+    data.update(
+        traced_bytes=current,
+        traced_peak_bytes=peak,
+        growth=[
+            {
+                "site": stat.traceback.format()
+                if group_by == "traceback"
+                else str(stat.traceback[0]),
+                "size_diff": stat.size_diff,
+                "count_diff": stat.count_diff,
+                "size": stat.size,
+                "count": stat.count,
+            }
+            for stat in stats[:top]
+        ],
+    )
+    return data
+
+
+def format_report(data):
+    lines = [f"pid {data['pid']}: {data['rss_bytes'] / 2**20:.1f} MiB resident"]
+    if not data["tracing"]:
+        lines.append("not tracing")
+        return "\n".join(lines) + "\n"
+    lines.append(
+        f"traced {data['traced_bytes'] / 2**20:.1f} MiB, "
+        f"peak {data['traced_peak_bytes'] / 2**20:.1f} MiB; "
+        "growth since the baseline:"
+    )
+    for entry in data["growth"]:
+        site = entry["site"]
+        if isinstance(site, list):
+            site = "\n    ".join(site)
+        lines.append(
+            f"{entry['size_diff'] / 1024:+10.1f} KiB "
+            f"{entry['count_diff']:+8} blocks  {site}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def handle_signal(signum, frame):
+    """First SIGUSR2 starts tracing, later ones write a report"""
+    if _baseline is None:
+        start()
+        logger.warning("Worker %s: tracing memory allocations", os.getpid())
+        return
+    os.makedirs(settings.MEMORY_REPORT_DIR, exist_ok=True)
+    path = os.path.join(
+        settings.MEMORY_REPORT_DIR,
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.txt",
+    )
+    with open(path, "w") as file:
+        file.write(format_report(report()))
+    logger.warning("Worker %s: memory report in %s", os.getpid(), path)
+
+
+def install_signal_handler():
+    signal.signal(signal.SIGUSR2, handle_signal)
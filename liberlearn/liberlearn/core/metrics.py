@@ -0,0 +1,253 @@
+"""
+Prometheus metrics, added up across worker processes.
+
+Each process counts in memory and writes its values to a file of its own
+in METRICS_DIR, at the end of a request at most every
+METRICS_FLUSH_INTERVAL seconds. ``/metrics`` adds up the files of every
+process, so the workers share nothing but a directory and whichever serves
+the scrape reports for all of them. Counters and histograms of workers that
+have exited still count toward the totals, their gauges don't: a scrape
+adds the files of exited workers into one archive file and deletes them,
+so recycled workers don't pile up files.
+"""
+import fcntl
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+from .memory import resident_memory
+
+# name -> metric
+REGISTRY = {}
+_values = {}
+_lock = threading.Lock()
+_last_flush = 0
+
+# Counters and histograms of exited workers, added up
+ARCHIVE = "archive.json"
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY[name] = self
+
+    def key(self, labels):
+        return (self.name, tuple(str(labels[n]) for n in self.labelnames))
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with _lock:
+            _values[key] = _values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        _values[self.key(labels)] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with _lock:
+            # Per bucket counts, then +Inf, sum and count
+            series = _values.get(key)
+            if series is None:
+                series = _values[key] = [0] * (len(self.buckets) + 3)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+
+REQUEST_DURATION = Histogram(
+    "liberlearn_http_request_duration_seconds",
+    "Time to respond to a request",
+    ["view", "method", "status"],
+)
+DB_QUERIES = Counter("liberlearn_db_queries_total", "Database queries run", ["view"])
+CACHE_READS = Counter(
+    "liberlearn_cache_reads_total",
+    "Keys read from the cache, by whether they were found",
+    ["result"],
+)
+ENROLLMENTS = Counter("liberlearn_enrollments_total", "Students enrolled in a course")
+ASSESSMENTS = Counter("liberlearn_assessments_created_total", "Assessments created")
+WORKER_MEMORY = Gauge(
+    "liberlearn_worker_resident_memory_bytes",
+    "Resident memory of the worker process",
+    ["pid"],
+)
+
+
+def flush(force=False):
+    """Write this process's values to its file, if due or ``force``"""
+    global _last_flush
+    now = time.monotonic()
+    if not force and now - _last_flush < settings.METRICS_FLUSH_INTERVAL:
+        return
+    _last_flush = now
+    pid = os.getpid()
+    WORKER_MEMORY.set(resident_memory(), pid=pid)
+    with _lock:
+        data = json.dumps(
+            {
+                "pid": pid,
+                "samples": [
+                    [name, labels, value] for (name, labels), value in _values.items()
+                ],
+            }
+        )
+    directory = Path(settings.METRICS_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    # Written aside and renamed, so readers never see half a file.
+    path = directory / f"{pid}.json"
+    temporary = directory / f"{pid}.json.tmp"
+    temporary.write_text(data)
+    os.replace(temporary, path)
+
+
+def reset():
+    """Forget the values of every process, e.g. when the server starts"""
+    _values.clear()
+    for path in Path(settings.METRICS_DIR).glob("*.json"):
+        path.unlink(missing_ok=True)
+
+
+def is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def read(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def add_samples(totals, samples, gauges=True):
+    for name, labels, value in samples:
+        metric = REGISTRY.get(name)
+        if metric is None or (metric.type == "gauge" and not gauges):
+            continue
+        key = (name, tuple(labels))
+        if isinstance(value, list):
+            total = totals.setdefault(key, [0] * len(value))
+            for i, n in enumerate(value):
+                total[i] += n
+        else:
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def archive_exited():
+    """Add the files of exited workers into the archive, and delete them"""
+    directory = Path(settings.METRICS_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    # Two scrapes at once mustn't both add the same files.
+    with open(directory / "archive.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        exited = []
+        for path in directory.glob("*.json"):
+            data = path.name != ARCHIVE and read(path)
+            if data and not is_running(data["pid"]):
+                exited.append((path, data))
+        if not exited:
+            return
+        archive = read(directory / ARCHIVE) or {"samples": []}
+        totals = add_samples({}, archive["samples"])
+        for _, data in exited:
+            add_samples(totals, data["samples"], gauges=False)
+        temporary = directory / f"{ARCHIVE}.tmp"
+        temporary.write_text(
+            json.dumps(
+                {
+                    "pid": None,
+                    "samples": [
+                        [name, labels, value]
+                        for (name, labels), value in totals.items()
+                    ],
+                }
+            )
+        )
+        os.replace(temporary, directory / ARCHIVE)
+        for path, _ in exited:
+            path.unlink(missing_ok=True)
+
+
+def collect():
+    """(name, labels) -> value, added up over every process's file"""
+    archive_exited()
+    totals = {}
+    for path in Path(settings.METRICS_DIR).glob("*.json"):
+        data = read(path)
+        if data is None:
+            continue
+        running = data["pid"] is not None and is_running(data["pid"])
+        add_samples(totals, data["samples"], gauges=running)
+    return totals
+
+
+def _escape(value):
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{%s}" % ",".join(f'{n}="{_escape(v)}"' for n, v in pairs)
+
+
+def exposition():
+    """Every metric in the Prometheus text format"""
+    flush(force=True)
+    totals = collect()
+    lines = []
+    for metric in REGISTRY.values():
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for (name, values), value in sorted(totals.items(), key=lambda item: item[0]):
+            if name != metric.name:
+                continue
+            labels = _labels(metric.labelnames, values)
+            if metric.type != "histogram":
+                lines.append(f"{name}{labels} {value}")
+                continue
+            cumulative = 0
+            bounds = [*map(str, metric.buckets), "+Inf"]
+            for bound, count in zip(bounds, value):
+                cumulative += count
+                labels = _labels(metric.labelnames, values, [("le", bound)])
+                lines.append(f"{name}_bucket{labels} {cumulative}")
+            labels = _labels(metric.labelnames, values)
+            lines.append(f"{name}_sum{labels} {value[-2]}")
+            lines.append(f"{name}_count{labels} {value[-1]}")
+    return "\n".join(lines) + "\n"
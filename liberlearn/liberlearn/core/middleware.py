@@ -0,0 +1,283 @@
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from whitenoise import middleware as whitenoise
+
+from . import metrics, profiling, querybudget, timing
+
+logger = logging.getLogger(__name__)
+timing_logger = logging.getLogger("liberlearn.timing")
+
+
+class WhiteNoiseMiddleware(whitenoise.WhiteNoiseMiddleware):
+    """
+    WhiteNoise middleware that also runs natively under ASGI, so static files
+    don't force Django to adapt the whole middleware chain to sync and pin a
+    thread for every async request.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class QueryBudgetMiddleware:
+    """
+    Check the queries of each request against the budget of its view in
+    QUERY_BUDGETS, and log ("warn") or raise ("raise") on an overrun,
+    depending on QUERY_BUDGET_ACTION. Unused when that is unset.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ACTION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with timing.recording() as recorder:
+            response = self.get_response(request)
+        return self.check(request, response, recorder)
+
+    async def __acall__(self, request):
+        with timing.recording() as recorder:
+            response = await self.get_response(request)
+        return self.check(request, response, recorder)
+
+    def check(self, request, response, recorder):
+        match = request.resolver_match
+        report = match and querybudget.overrun(match.url_name, recorder)
+        if report:
+            if settings.QUERY_BUDGET_ACTION == "raise":
+                raise querybudget.QueryBudgetExceeded(report)
+            logger.warning(report)
+        return response
+
+
+class ServerTimingMiddleware:
+    """
+    Time a sample of SERVER_TIMING_SAMPLE_RATE of the requests: in total,
+    in the view and in rendering, and their SQL, cache reads and
+    authentication. The timings go out as a JSON line on the
+    "liberlearn.timing" logger, and to staff, or everyone if
+    SERVER_TIMING_HEADER is set, in a ``Server-Timing`` header, which browser
+    dev tools show next to the request. Requests left out of the sample only
+    cost a random number.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.sample_rate = settings.SERVER_TIMING_SAMPLE_RATE
+        if not self.sample_rate:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        else:
+            # Only in a sync stack: in an async one each hook would cost
+            # every request a trip to a thread.
+            self.process_view = self._process_view
+            self.process_template_response = self._process_template_response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        timings, token = timing.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            timing.stop(token)
+        return self.report(request, response, timings, self.shows_header(request))
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+        timings, token = timing.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            timing.stop(token)
+        # Reading the session user may query the database.
+        shows_header = await sync_to_async(self.shows_header)(request)
+        return self.report(request, response, timings, shows_header)
+
+    def shows_header(self, request):
+        # The timings tell how much work a request took, which anonymous
+        # clients have no business knowing.
+        if settings.SERVER_TIMING_HEADER:
+            return True
+        user = getattr(request, "user", None)
+        return user is not None and user.is_staff
+
+    def _process_view(self, request, view_func, view_args, view_kwargs):
+        timings = timing.current()
+        if timings is not None:
+            timings.view_started = time.perf_counter()
+
+    def _process_template_response(self, request, response):
+        timings = timing.current()
+        if timings is not None:
+            timings.view_ended = time.perf_counter()
+
+            def rendered(response):
+                timings.render_ended = time.perf_counter()
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def report(self, request, response, timings, shows_header):
+        total = timings.elapsed()
+        phases = {"total": total, **timings.phases}
+        if timings.view_started is not None:
+            view_ended = timings.view_ended or timings.started + total
+            phases["view"] = view_ended - timings.view_started
+        if timings.render_ended is not None:
+            phases["render"] = timings.render_ended - timings.view_ended
+        descriptions = {
+            "db": f"{timings.queries} queries",
+            "cache": (f"{timings.cache_hits} hits, {timings.cache_misses} misses"),
+        }
+
+        if shows_header:
+            response["Server-Timing"] = ", ".join(
+                f"{name};dur={seconds * 1000:.1f}"
+                + (f';desc="{descriptions[name]}"' if name in descriptions else "")
+                for name, seconds in phases.items()
+            )
+        match = request.resolver_match
+        timing_logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "view": match.url_name if match else None,
+                    "status": response.status_code,
+                    **{
+                        f"{name}_ms": round(seconds * 1000, 2)
+                        for name, seconds in phases.items()
+                    },
+                    "queries": timings.queries,
+                    "cache_hits": timings.cache_hits,
+                    "cache_misses": timings.cache_misses,
+                }
+            )
+        )
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Count every request into the Prometheus metrics: its latency, and the
+    queries and cache reads it made. Reuses the timings of
+    ServerTimingMiddleware when the request is in its sample.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                timing.stop(token)
+        self.record(request, response, timings)
+        return response
+
+    async def __acall__(self, request):
+        timings, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                timing.stop(token)
+        self.record(request, response, timings)
+        return response
+
+    def start(self, request):
+        timings = timing.current()
+        if timings is not None:
+            return timings, None
+        return timing.start(request)
+
+    def record(self, request, response, timings):
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else "unmatched"
+        metrics.REQUEST_DURATION.observe(
+            timings.elapsed(),
+            view=view,
+            method=request.method,
+            status=response.status_code,
+        )
+        if timings.queries:
+            metrics.DB_QUERIES.inc(timings.queries, view=view)
+        if timings.cache_hits:
+            metrics.CACHE_READS.inc(timings.cache_hits, result="hit")
+        if timings.cache_misses:
+            metrics.CACHE_READS.inc(timings.cache_misses, result="miss")
+        metrics.flush()
+
+
+class ProfilingMiddleware:
+    """
+    Profile the requests that ask for it and may, see
+    liberlearn.core.profiling. Only in a sync stack; under ASGI requests
+    pass through untouched.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.get_response(request)
+        mode = profiling.requested_mode(request)
+        if mode is None:
+            return self.get_response(request)
+        return profiling.profile(request, self.get_response, mode)
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.3 on 2026-10-19 13:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="BootStep",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("fingerprint", models.CharField(max_length=100)),
+                ("ran_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
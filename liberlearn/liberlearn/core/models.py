@@ -0,0 +1,15 @@
+from django.db import models
+
+
+class BootStep(models.Model):
+    """
+    The fingerprint of the sources a `manage.py boot` build step last ran
+    on, kept in the database as the filesystem may not outlive a restart.
+    """
+
+    name = models.CharField(max_length=50, primary_key=True)
+    fingerprint = models.CharField(max_length=100)
+    ran_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,145 @@
+"""
+Profiling single requests on demand.
+
+A request is profiled when it carries ``?profile`` and comes from a logged
+in staff member, or carries an ``X-Profile-Token`` header from
+``manage.py profiling_token``, which is how API clients without a session
+opt in. ``?profile=sample`` (the default) samples the stack every
+PROFILING_INTERVAL seconds of wall time and writes the collapsed stacks
+that flame graph tools (flamegraph.pl, speedscope, inferno) read.
+``?profile=cprofile`` runs the request under cProfile and writes a pstats
+dump with a text summary next to it.
+
+Profiles go to PROFILING_DIR, and the response's ``X-Profile`` header
+points at them. Requests without the flag only pay for checking it.
+"""
+import cProfile
+import io
+import os
+import pstats
+import signal
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+from django.urls import reverse
+
+SALT = "liberlearn.core.profiling"
+HEADER = "HTTP_X_PROFILE_TOKEN"
+MODES = ("sample", "cprofile")
+
+
+def issue_token(max_age):
+    return signing.dumps({"exp": int(time.time() + max_age)}, salt=SALT)
+
+
+def token_is_valid(token):
+    try:
+        claims = signing.loads(token, salt=SALT)
+    except signing.BadSignature:
+        return False
+    return claims["exp"] >= time.time()
+
+
+def requested_mode(request):
+    """The profiler a request asks for and may use, or None"""
+    if HEADER not in request.META and "profile" not in request.GET:
+        return None
+    mode = request.GET.get("profile") or "sample"
+    if mode not in MODES:
+        return None
+    if HEADER in request.META:
+        allowed = token_is_valid(request.META[HEADER])
+    else:
+        allowed = request.user.is_staff
+    return mode if allowed else None
+
+
+class StackSampler:
+    """
+    Count the stacks of the current thread at a fixed wall-clock interval,
+    using SIGALRM, so time waiting on the database shows up too. Signals
+    only reach the main thread, which is where gunicorn's sync workers run
+    requests.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.root = str(settings.BASE_DIR.parent)
+
+    def sample(self, signum, frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            filename = code.co_filename
+            if filename.startswith(self.root):
+                filename = filename[len(self.root) + 1 :]
+            else:
+                filename = filename.rpartition("site-packages/")[2]
+            names.append(f"{code.co_name} ({filename}:{frame.f_lineno})")
+            frame = frame.f_back
+        self.stacks[";".join(reversed(names))] += 1
+
+    def __enter__(self):
+        self.previous = signal.signal(signal.SIGALRM, self.sample)
+        signal.setitimer(signal.ITIMER_REAL, self.interval, self.interval)
+        return self
+
+    def __exit__(self, *exc_info):
+        signal.setitimer(signal.ITIMER_REAL, 0, 0)
+        signal.signal(signal.SIGALRM, self.previous)
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+def can_sample():
+    return (
+        hasattr(signal, "setitimer")
+        and threading.current_thread() is threading.main_thread()
+        and signal.getsignal(signal.SIGALRM) in (signal.SIG_DFL, None)
+    )
+
+
+def profile(request, get_response, mode):
+    """Run ``get_response(request)`` under a profiler and save the result"""
+    if mode == "sample" and not can_sample():
+        mode = "cprofile"
+    if mode == "sample":
+        with StackSampler(settings.PROFILING_INTERVAL) as sampler:
+            response = get_response(request)
+    else:
+        profiler = cProfile.Profile()
+        response = profiler.runcall(get_response, request)
+
+    now = time.time()
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+    match = request.resolver_match
+    name = "-".join(
+        [
+            f"{stamp}.{int(now * 1000) % 1000:03}",
+            (match.url_name if match else None) or "request",
+            str(os.getpid()),
+        ]
+    )
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    path = os.path.join(settings.PROFILING_DIR, name)
+    if mode == "sample":
+        filename = name + ".collapsed"
+        with open(path + ".collapsed", "w") as file:
+            file.write(sampler.collapsed())
+    else:
+        filename = name + ".txt"
+        summary = io.StringIO()
+        stats = pstats.Stats(profiler, stream=summary)
+        stats.dump_stats(path + ".prof")
+        stats.sort_stats("cumulative").print_stats(60)
+        with open(path + ".txt", "w") as file:
+            file.write(summary.getvalue())
+    response["X-Profile"] = request.build_absolute_uri(
+        reverse("profile", args=[filename])
+    )
+    return response
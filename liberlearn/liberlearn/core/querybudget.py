@@ -0,0 +1,59 @@
+"""
+Query budgets: the most queries a view may run in one request, declared by
+URL name in ``settings.QUERY_BUDGETS``.
+
+QueryBudgetMiddleware checks every request in development, sync or async,
+and tests can hold a block of code to a budget with ``query_budget()``:
+
+    with query_budget("subject-list"):
+        self.client.get("/api/subjects/")
+
+Both record through ``timing.recording()``, so the queries async views
+hand to worker threads count too, on every database. Either way an overrun
+is reported with the statements run more than once, which is where the
+extra queries of an N+1 come from.
+"""
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .timing import recording
+
+# Duplicated statements shown in a report
+SHOWN_DUPLICATES = 5
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def overrun(url_name, recorder, budget=None):
+    """A report if ``recorder`` holds more queries than the budget, or None"""
+    if budget is None:
+        budget = settings.QUERY_BUDGETS.get(url_name)
+    if budget is None or recorder.count <= budget:
+        return None
+    lines = [
+        f"{url_name} ran {recorder.count} queries, " f"over its budget of {budget}."
+    ]
+    duplicates = recorder.duplicates()
+    if duplicates:
+        lines.append("Repeated statements:")
+        lines += [f"  {n} x {sql}" for sql, n in duplicates[:SHOWN_DUPLICATES]]
+    return "\n".join(lines)
+
+
+@contextmanager
+def query_budget(url_name, budget=None):
+    """
+    Raise QueryBudgetExceeded if the block runs more queries than the budget
+    of ``url_name``, or than ``budget`` if given.
+    """
+    if budget is None and url_name not in settings.QUERY_BUDGETS:
+        raise ImproperlyConfigured(f"No query budget for {url_name!r}")
+    with recording() as recorder:
+        yield recorder
+    report = overrun(url_name, recorder, budget)
+    if report:
+        raise QueryBudgetExceeded(report)
@@ -0,0 +1,86 @@
+"""
+Serving files in byte ranges, so interrupted downloads can resume.
+
+Only a single ``bytes=`` range is honoured, which is what download managers
+and ``curl -C -`` ask for; anything else gets the whole file. So does a
+range with an ``If-Range`` ETag other than the file's, as the client holds
+part of a file that has since been replaced.
+"""
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header, quote_etag
+
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """
+    The inclusive (start, end) of a ``Range`` header for a file of ``size``
+    bytes, False if it can't be satisfied, or None to send the whole file
+    """
+    match = RANGE.match(header.replace(" ", ""))
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        # The final ``last`` bytes
+        if int(last) == 0:
+            return False
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        return False
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def read_range(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def file_response(
+    request, path, etag, content_type="application/octet-stream", filename=None
+):
+    """The file at ``path``, or the byte range of it the request asks for"""
+    size = os.path.getsize(path)
+    etag = quote_etag(etag)
+    byte_range = None
+    if request.META.get("HTTP_IF_RANGE", etag) == etag:
+        byte_range = parse_range(request.META.get("HTTP_RANGE", ""), size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+    elif byte_range is None:
+        response = FileResponse(
+            open(path, "rb"),
+            content_type=content_type,
+            as_attachment=filename is not None,
+            filename=filename or "",
+        )
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            read_range(open(path, "rb"), start, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = end - start + 1
+        if filename is not None:
+            response["Content-Disposition"] = content_disposition_header(True, filename)
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    return response
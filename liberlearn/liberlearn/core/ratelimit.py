@@ -0,0 +1,149 @@
+"""
+Token-bucket rate limits kept in the shared cache.
+
+Each scope in ``settings.RATE_LIMITS`` maps bucket kinds to DRF style rates:
+
+    "enroll": {"user": "5/min", "ip": "30/min", "endpoint": "50/s"}
+
+``"5/min"`` is a bucket of 5 tokens refilled at 5 a minute. A request takes
+one token from each of its buckets: the user's, the client IP's and the one
+shared by everybody hitting the scope, in that order. A refused request
+gives back what it took and never reaches the shared bucket, so one client
+over its own limit can't drain it for everybody else.
+
+Buckets are stored the GCRA way, as the time in milliseconds at which the
+bucket will be full again. Taking a token is a single atomic ``incr`` of
+that time by the token interval, so concurrent workers never lose updates
+and the common case costs one cache round trip per bucket.
+"""
+import hashlib
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework.throttling import BaseThrottle
+
+KEY = "ratelimit:{scope}:{kind}:{ident}"
+# Per client buckets first
+KINDS = ("user", "ip", "endpoint")
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """``"5/min"`` -> (5 tokens, 60 seconds)"""
+    num, period = rate.split("/")
+    return int(num), PERIODS[period[0]]
+
+
+def client_ip(request):
+    # Honours REST_FRAMEWORK["NUM_PROXIES"], like DRF's own throttles.
+    return BaseThrottle().get_ident(request)
+
+
+def token_interval(rate):
+    """Whole milliseconds between tokens, so the cache can increment them"""
+    capacity, period = parse_rate(rate)
+    return math.ceil(period * 1000 / capacity)
+
+
+def take_token(key, rate):
+    """
+    Take a token from the bucket at ``key``. Returns 0 if one was available,
+    else the seconds until there will be.
+    """
+    capacity, period = parse_rate(rate)
+    interval = token_interval(rate)
+    window = interval * capacity
+    now = int(time.time() * 1000)
+    try:
+        full_at = cache.incr(key, interval)
+    except ValueError:
+        if cache.add(key, now + interval, period):
+            return 0
+        full_at = cache.incr(key, interval)
+
+    if full_at < now:
+        # Idle bucket: it can't hold more than its capacity, so restart it
+        # from now instead of from when it last emptied. Racing requests
+        # can only make this more lenient.
+        cache.set(key, now + interval, period)
+        return 0
+    if full_at <= now + window:
+        return 0
+
+    # Refused requests don't take a token. The expiry is only pushed back
+    # here, so a client retrying too fast can't outlive its bucket; one that
+    # stays within its rate may at worst see it refill a little early.
+    cache.decr(key, interval)
+    cache.touch(key, math.ceil((full_at - now) / 1000))
+    return (full_at - now - window) / 1000
+
+
+def give_back(key, rate):
+    try:
+        cache.decr(key, token_interval(rate))
+    except ValueError:
+        # Expired meanwhile, so full anyway
+        pass
+
+
+def check(request, scope, user_id=None):
+    """
+    Take a token from each of the scope's buckets for ``request``. Returns
+    0 if it may proceed, else the seconds to wait before retrying.
+    """
+    rates = settings.RATE_LIMITS.get(scope, {})
+    idents = {"user": user_id, "ip": client_ip(request), "endpoint": "all"}
+    taken = []
+    for kind in KINDS:
+        if kind not in rates or idents[kind] is None:
+            continue
+        key = KEY.format(scope=scope, kind=kind, ident=idents[kind])
+        wait = take_token(key, rates[kind])
+        if wait:
+            for key, rate in taken:
+                give_back(key, rate)
+            return wait
+        taken.append((key, rates[kind]))
+    return 0
+
+
+def login_ident(value):
+    """The user bucket ident for a username typed into a login form"""
+    # Anything can be typed in there; keep keys cache-safe.
+    return hashlib.sha256(value.lower().encode()).hexdigest()[:32]
+
+
+def too_many_requests(wait):
+    response = HttpResponse("Too many requests.", status=429)
+    response["Retry-After"] = str(math.ceil(wait))
+    return response
+
+
+def ratelimit(scope, user_field=None, methods=("POST",)):
+    """
+    Rate limit a Django view under ``scope``. The user bucket is keyed by
+    the logged in user, or for login forms by the ``user_field`` POST field.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapped_view(request, *args, **kwargs):
+            if request.method in methods:
+                if request.user.is_authenticated:
+                    user_id = request.user.pk
+                elif request.POST.get(user_field):
+                    user_id = login_ident(request.POST[user_field])
+                else:
+                    user_id = None
+                wait = check(request, scope, user_id)
+                if wait:
+                    return too_many_requests(wait)
+            return view_func(request, *args, **kwargs)
+
+        return wrapped_view
+
+    return decorator
@@ -0,0 +1,84 @@
+"""
+Cached, database backed sessions that only write when they have to.
+
+Reads come from the cache, with the session table as the fallback, like
+Django's cached_db engine. Saving is write-through to both, but skipped
+when the session wasn't read, or its data is unchanged since it was loaded
+and its stored expiry is recent enough. With SESSION_SAVE_EVERY_REQUEST the
+expiry then slides forward at most once per SESSION_REFRESH_INTERVAL
+instead of on every request.
+
+The cache is only used when all workers share it (CACHE_IS_SHARED): with a
+per-process cache a logout on one worker would leave the session valid in
+the others' caches, so every read goes to the database instead.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+
+KEY_PREFIX = "liberlearn.core.sessions.cached_db"
+
+
+class SessionStore(cached_db.SessionStore):
+    # Cached values are (data, expiry date) pairs, unlike Django's engine.
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._stored_digest = None
+        self._stored_expiry = None
+
+    def _digest(self, data):
+        return hashlib.sha1(self.serializer().dumps(data)).digest()
+
+    def load(self):
+        cached = None
+        if settings.CACHE_IS_SHARED:
+            try:
+                cached = self._cache.get(self.cache_key)
+            except Exception:
+                # Some backends (e.g. memcache) raise an exception on
+                # invalid cache keys. If this happens, reset the session.
+                cached = None
+
+        if cached is None:
+            s = self._get_session_from_db()
+            if not s:
+                return {}
+            data, expiry = self.decode(s.session_data), s.expire_date
+            if settings.CACHE_IS_SHARED:
+                self._cache.set(
+                    self.cache_key, (data, expiry), self.get_expiry_age(expiry=expiry)
+                )
+        else:
+            data, expiry = cached
+        self._stored_digest = self._digest(data)
+        self._stored_expiry = expiry
+        return data
+
+    def is_stale(self):
+        """Whether the stored copy differs from this one or is due a refresh"""
+        if not self.accessed:
+            # Never read, so neither changed nor worth sliding forward
+            return False
+        if self._stored_digest is None or not self.session_key:
+            return True
+        if self._digest(self._session) != self._stored_digest:
+            return True
+        refresh = timedelta(seconds=settings.SESSION_REFRESH_INTERVAL)
+        return self.get_expiry_date() - self._stored_expiry >= refresh
+
+    def save(self, must_create=False):
+        if not must_create and not self.is_stale():
+            return
+        DBStore.save(self, must_create)
+        expiry = self.get_expiry_date()
+        if settings.CACHE_IS_SHARED:
+            self._cache.set(
+                self.cache_key, (self._session, expiry), self.get_expiry_age()
+            )
+        self._stored_digest = self._digest(self._session)
+        self._stored_expiry = expiry
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .slowqueries import record_slow_query
+from .timing import record_query
+
+
+@receiver(connection_created)
+def install_execute_wrappers(sender, connection, **kwargs):
+    # Fired again on reconnects of the same connection. First in line, so
+    # they stay under wrappers pushed by connection.execute_wrapper(), which
+    # pop the last one when they exit.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+    if (
+        settings.SLOW_QUERY_THRESHOLD_MS is not None
+        and record_slow_query not in connection.execute_wrappers
+    ):
+        connection.execute_wrappers.insert(0, record_slow_query)
@@ -0,0 +1,111 @@
+"""
+A log of the queries slower than SLOW_QUERY_THRESHOLD_MS.
+
+Every connection runs its queries through ``record_slow_query``. A slow one
+is appended to SLOW_QUERY_LOG as a JSON line with its fingerprint, the view
+it ran for and the application frames that issued it. A sample of
+SLOW_QUERY_EXPLAIN_RATE of them also gets the database's query plan.
+``manage.py slow_queries`` ranks the fingerprints by their total time.
+"""
+import json
+import os
+import random
+import time
+import traceback
+
+from django.conf import settings
+
+from . import timing
+from .sql import fingerprint
+
+# Innermost application frames kept per query
+STACK_DEPTH = 8
+# Modules every query passes through, left out of the stacks
+INSTRUMENTATION = (
+    os.path.join("core", "middleware.py"),
+    os.path.join("core", "slowqueries.py"),
+)
+EXPLAIN = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN ",
+    "mysql": "EXPLAIN ",
+}
+
+
+def application_stack():
+    """The innermost frames of the project's own code that led here"""
+    root = str(settings.BASE_DIR)
+    frames = [
+        frame
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(root)
+        and "site-packages" not in frame.filename
+        and not frame.filename.endswith(INSTRUMENTATION)
+    ]
+    return [
+        f"{frame.filename[len(root) + 1 :]}:{frame.lineno} in {frame.name}"
+        for frame in frames[-STACK_DEPTH:]
+    ]
+
+
+def explain(connection, sql, params):
+    prefix = EXPLAIN.get(connection.vendor)
+    # Skipped in transactions: a failing EXPLAIN would abort PostgreSQL's.
+    if (
+        prefix is None
+        or connection.in_atomic_block
+        or not sql.lstrip().upper().startswith("SELECT")
+    ):
+        return None
+    # A DB-API cursor, past the execute wrappers, so the plan is neither
+    # logged nor counted as one of the request's queries.
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(prefix + sql, params)
+        return [" ".join(map(str, row)) for row in cursor.fetchall()]
+    except Exception as exc:
+        return [f"EXPLAIN failed: {exc}"]
+    finally:
+        cursor.close()
+
+
+def record_slow_query(execute, sql, params, many, context):
+    """An execute wrapper, installed on every connection by CoreConfig"""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        if duration * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+            log(sql, params, many, context["connection"], duration)
+
+
+def log(sql, params, many, connection, duration):
+    timings = timing.current()
+    match = timings and timings.request and timings.request.resolver_match
+    entry = {
+        "at": time.time(),
+        "ms": round(duration * 1000, 2),
+        "fingerprint": fingerprint(sql),
+        "sql": sql,
+        "view": match.url_name if match else None,
+        "database": connection.alias,
+        "stack": application_stack(),
+    }
+    if not many and random.random() < settings.SLOW_QUERY_EXPLAIN_RATE:
+        entry["plan"] = explain(connection, sql, params)
+    with open(settings.SLOW_QUERY_LOG, "a") as file:
+        # One write per line, so lines of concurrent workers don't mix.
+        file.write(json.dumps(entry, default=str) + "\n")
+
+
+def read_log(path=None):
+    try:
+        with open(path or settings.SLOW_QUERY_LOG) as file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        return
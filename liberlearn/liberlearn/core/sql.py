@@ -0,0 +1,56 @@
+"""
+SQL fingerprints and query recording.
+
+A fingerprint is a statement with its literals and placeholder lists
+collapsed, so the same query run for different rows, the tell-tale of an
+N+1, groups under one key.
+"""
+import re
+import time
+from collections import Counter
+
+NORMALIZE = [
+    # String literals, then numbers and placeholders.
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"%s|\$\d+"), "?"),
+    # IN lists of any length.
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(...)"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def fingerprint(sql):
+    for pattern, replacement in NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+class QueryRecorder:
+    """
+    A ``connection.execute_wrapper()`` that records the SQL and duration of
+    every statement, unlike ``connection.queries`` without a length limit.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self):
+        """(fingerprint, times run) of repeated statements, most run first"""
+        counts = Counter(fingerprint(sql) for sql, _ in self.queries)
+        return [(sql, n) for sql, n in counts.most_common() if n > 1]
@@ -0,0 +1,105 @@
+"""
+Where the time of a request goes.
+
+MetricsMiddleware, or ServerTimingMiddleware for its sample of requests,
+starts a RequestTimings and makes it current for everything the request
+runs, including async views and the threads they hand ORM calls to.
+Database queries, cache reads and anything wrapped in ``phase()`` add to
+the current timings, and are a context variable lookup away from free when
+there are none. Queries also go to the recorders of the ``recording()``
+blocks they run in, such as the query budgets'.
+"""
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from .sql import QueryRecorder
+
+_current = ContextVar("request_timings", default=None)
+# The recorders of the recording() blocks around the current code, innermost
+# last
+_recorders = ContextVar("query_recorders", default=())
+
+
+class RequestTimings:
+    def __init__(self, request=None):
+        self.request = request
+        self.started = time.perf_counter()
+        # phase -> seconds
+        self.phases = defaultdict(float)
+        self.queries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.view_started = None
+        self.view_ended = None
+        self.render_ended = None
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current():
+    return _current.get()
+
+
+def start(request=None):
+    """Make a new RequestTimings current; returns it and a reset token"""
+    timings = RequestTimings(request)
+    return timings, _current.set(timings)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+@contextmanager
+def phase(name):
+    """Add the time spent in the block, or decorated function, to ``name``"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.phases[name] += time.perf_counter() - started
+
+
+@contextmanager
+def recording():
+    """
+    Record the queries of the block and whatever it runs, on any thread the
+    context is carried to, in a QueryRecorder
+    """
+    recorder = QueryRecorder()
+    token = _recorders.set((*_recorders.get(), recorder))
+    try:
+        yield recorder
+    finally:
+        _recorders.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """An execute wrapper, installed on every connection by CoreConfig"""
+    for recorder in _recorders.get():
+        execute = partial(recorder, execute)
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.phases["db"] += time.perf_counter() - started
+
+
+def record_cache_read(seconds, hits, misses):
+    timings = _current.get()
+    if timings is not None:
+        timings.phases["cache"] += seconds
+        timings.cache_hits += hits
+        timings.cache_misses += misses
@@ -0,0 +1,85 @@
+import os
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    JsonResponse,
+)
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_http_methods
+
+from . import memory, metrics
+
+
+def metrics_view(request):
+    """
+    The Prometheus metrics of every worker, see liberlearn.core.metrics.
+    Only for scrapes with the METRICS_TOKEN, or staff without one set.
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        allowed = constant_time_compare(
+            request.headers.get("Authorization", ""), f"Bearer {token}"
+        )
+    else:
+        allowed = request.user.is_staff
+    if not allowed:
+        response = HttpResponse("Unauthorized.", status=401)
+        response["WWW-Authenticate"] = 'Bearer realm="metrics"'
+        return response
+    return HttpResponse(
+        metrics.exposition(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@staff_member_required
+def profile_view(request, name):
+    """A profile saved by liberlearn.core.profiling"""
+    path = os.path.join(settings.PROFILING_DIR, os.path.basename(name))
+    if not os.path.isfile(path):
+        raise Http404("No such profile")
+    # Collapsed stacks and summaries are text, dumps are for pstats.
+    return FileResponse(
+        open(path, "rb"),
+        as_attachment=name.endswith(".prof"),
+        content_type=(
+            "application/octet-stream"
+            if name.endswith(".prof")
+            else "text/plain; charset=utf-8"
+        ),
+    )
+
+
+@staff_member_required
+@require_http_methods(["GET", "POST"])
+def memory_view(request):
+    """
+    This worker's memory. GET reports the allocation sites grown most since
+    the baseline (``?top=``, ``?group_by=lineno|filename|traceback``); POST
+    ``action=start`` starts tracing or takes a new baseline, ``action=stop``
+    stops it.
+    """
+    if request.method == "POST":
+        action = request.POST.get("action")
+        if action == "start":
+            memory.start()
+        elif action == "stop":
+            memory.stop()
+        else:
+            return HttpResponseBadRequest("action must be start or stop")
+        return JsonResponse(memory.report(top=0))
+
+    group_by = request.GET.get("group_by", "lineno")
+    try:
+        top = int(request.GET.get("top", memory.TOP))
+    except ValueError:
+        top = memory.TOP
+    if group_by not in memory.GROUPINGS:
+        return HttpResponseBadRequest(
+            f"group_by must be one of {', '.join(memory.GROUPINGS)}"
+        )
+    return JsonResponse(memory.report(top, group_by))
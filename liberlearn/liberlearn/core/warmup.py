@@ -0,0 +1,39 @@
+"""
+Warm the per-process caches the first requests would otherwise fill.
+
+Run in the gunicorn master after the app is preloaded, so every forked
+worker starts with them already populated.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.urls import reverse
+
+TEMPLATES = [
+    "base.html",
+    "course/course/list.html",
+    "course/course/detail.html",
+    "students/course/list.html",
+    "students/course/detail.html",
+    "registration/login.html",
+    "rest_framework/api.html",
+]
+
+
+def warm_up():
+    from liberlearn.api import schema
+    from liberlearn.course.models import File, Image, Text, Video
+
+    # Populates the URL resolver.
+    reverse("subject-list")
+    # Compiled templates are kept by the cached loader outside DEBUG.
+    for name in TEMPLATES:
+        try:
+            get_template(name)
+        except TemplateDoesNotExist:
+            pass
+    ContentType.objects.get_for_models(Text, File, Image, Video)
+    schema.load_schema()
+    # Sockets must not be shared with the workers about to be forked.
+    connections.close_all()
@@ -1,4 +1,6 @@
 from django.contrib import admin
+from django.contrib.contenttypes.models import ContentType
+from django.core.paginator import Paginator
 from nested_inline.admin import NestedModelAdmin, NestedStackedInline
 
 from .models import (
@@ -12,36 +14,99 @@ from .models import (
 )
 
 
+@admin.register(ContentType)
+class ContentTypeAdmin(admin.ModelAdmin):
+    """Read-only, for the content type autocomplete of Content"""
+
+    search_fields = ["app_label", "model"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class PaginatedInline:
+    """
+    Inline that only builds forms for one page of the parent's rows, picked
+    with the ``page_param`` query parameter. Needs a PaginatedInlinesAdmin.
+    """
+
+    template = "admin/course/paginated_tabular.html"
+    per_page = 25
+    page_param = None
+    page = None
+
+    def get_page(self, request, obj):
+        pks = (
+            super()
+            .get_queryset(request)
+            .filter(**{self.fk_name: obj})
+            .values_list("pk", flat=True)
+        )
+        paginator = Paginator(pks, self.per_page)
+        return paginator.get_page(request.GET.get(self.page_param))
+
+
+class PaginatedInlinesAdmin(admin.ModelAdmin):
+    def get_formset_kwargs(self, request, obj, inline, prefix):
+        kwargs = super().get_formset_kwargs(request, obj, inline, prefix)
+        if obj is not None and isinstance(inline, PaginatedInline):
+            # Inline instances are created per request, so the page can be
+            # kept on them for the template.
+            inline.page = inline.get_page(request, obj)
+            kwargs["queryset"] = kwargs["queryset"].filter(
+                pk__in=list(inline.page.object_list)
+            )
+        return kwargs
+
+
 @admin.register(Subject)
 class SubjectAdmin(admin.ModelAdmin):
     list_display = ["id", "title", "slug"]
+    search_fields = ["title"]
     prepopulated_fields = {"slug": ("title",)}
 
 
-class ContentInline(NestedStackedInline):
+class ContentInline(PaginatedInline, admin.TabularInline):
     model = Content
     extra = 1
     fk_name = "lesson"
+    page_param = "contents_page"
+    autocomplete_fields = ["content_type"]
 
 
-class LessonInline(NestedStackedInline):
+class LessonInline(PaginatedInline, admin.TabularInline):
     model = Lesson
     extra = 2
     fk_name = "course"
-    inlines = [ContentInline]
+    page_param = "lessons_page"
+    # Contents are edited on the lesson's own page, one lesson at a time.
+    show_change_link = True
 
 
 @admin.register(Lesson)
-class LessonAdmin(NestedModelAdmin):
+class LessonAdmin(PaginatedInlinesAdmin):
+    list_display = ["id", "title", "course", "order"]
+    list_select_related = ["course"]
+    list_filter = ["course__subject"]
+    search_fields = ["title", "course__title"]
+    autocomplete_fields = ["course"]
     inlines = [ContentInline]
 
 
 @admin.register(Course)
-class CourseAdmin(NestedModelAdmin):
+class CourseAdmin(PaginatedInlinesAdmin):
     list_display = ["id", "title", "subject", "created_at"]
+    list_select_related = ["subject"]
     list_filter = ["created_at", "subject"]
     search_fields = ["title", "overview"]
     prepopulated_fields = {"slug": ("title",)}
+    autocomplete_fields = ["mentor", "subject"]
     inlines = [LessonInline]
 
 
@@ -62,9 +127,14 @@ class QuestionInline(NestedStackedInline):
 @admin.register(Assessment)
 class AssessmentAdmin(NestedModelAdmin):
     list_display = ["id", "title", "course", "created_at"]
+    list_select_related = ["course"]
     list_filter = ["created_at", "course"]
     search_fields = ["title", "description"]
     inlines = [QuestionInline]
 
 
-admin.site.register(Content)
+@admin.register(Content)
+class ContentAdmin(admin.ModelAdmin):
+    list_display = ["id", "__str__", "lesson", "order"]
+    list_select_related = ["lesson", "content_type"]
+    autocomplete_fields = ["lesson", "content_type"]
@@ -0,0 +1,335 @@
+"""
+Offline course bundles, for facilities with intermittent connectivity.
+
+A bundle is a ``.tar.gz`` of one course: ``course.json`` (the course, its
+outline and assessments), a ``lesson.json`` per lesson with its contents
+rendered to HTML, and the media files under MEDIA_ROOT they show, at
+``media/<name>`` as in the fragments' ``/media/`` URLs.
+
+The course and each lesson are packed into a separately gzipped part, named
+by a hash of what went into it and kept in COURSE_BUNDLE_DIR/parts. Gzip
+members concatenate into one valid gzip stream, so a bundle is its parts
+copied one after the other. A rebuild still renders and hashes every
+lesson to find out which changed; what it saves is compressing and copying
+the media of the unchanged ones, which is most of the work. Bundles are
+rebuilt in a background thread after a change to anything in the course,
+and named by a hash of their parts so a resumed download can tell whether
+it still has the same file.
+
+Any worker may build a course, so builds of one course take an exclusive
+lock on its directory first: otherwise a build of older data finishing
+last could point current.json at its bundle and delete the newer one.
+Builds also share a lock on the parts directory, which pruning takes
+exclusively, as the parts of a bundle being built are in no current.json
+yet.
+"""
+import fcntl
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tarfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.utils import timezone
+
+from . import images
+from .models import Assessment, Course, Lesson
+from .player import content_data, lesson_contents
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# The end of a tar archive, two empty blocks, as a part of its own
+TRAILER = gzip.compress(bytes(2 * tarfile.BLOCKSIZE), mtime=0)
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def course_dir(course_id):
+    return Path(settings.COURSE_BUNDLE_DIR) / str(course_id)
+
+
+def parts_dir():
+    return Path(settings.COURSE_BUNDLE_DIR) / "parts"
+
+
+@contextmanager
+def directory_lock(directory, operation=fcntl.LOCK_EX):
+    """Hold the directory locked against other processes"""
+    directory.mkdir(parents=True, exist_ok=True)
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        fcntl.flock(fd, operation)
+        yield
+    finally:
+        # Closing releases the lock.
+        os.close(fd)
+
+
+def course_lock(course_id):
+    return directory_lock(course_dir(course_id))
+
+
+def current(course_id):
+    """The manifest of the course's latest bundle, or None"""
+    try:
+        with open(course_dir(course_id) / "current.json") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return None
+    manifest["path"] = course_dir(course_id) / f"{manifest['version']}.tar.gz"
+    return manifest if manifest["path"].exists() else None
+
+
+def encode(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, indent=1).encode()
+
+
+def media_names(content):
+    """The MEDIA_ROOT files an item of the content shows"""
+    names = []
+    for item in getattr(content, content.items_name).all():
+        if content.content_type.model == "image":
+            urls = [item.image]
+            urls += [d["url"] for d in item.derivatives.get("items", [])]
+        elif content.content_type.model == "file":
+            urls = [item.file]
+        else:
+            continue
+        for url in urls:
+            name = images.source_name(url)
+            if name and default_storage.exists(name):
+                names.append(name)
+    return names
+
+
+def course_part(course):
+    lessons = course.lessons.order_by("order", "id").values("id", "order", "title")
+    assessments = Assessment.objects.filter(course=course).prefetch_related(
+        "questions__choices"
+    )
+    data = {
+        "id": course.id,
+        "title": course.title,
+        "slug": course.slug,
+        "overview": course.overview,
+        "subject": course.subject.title,
+        "mentor": course.mentor.username,
+        "lessons": [{**lesson, "path": lesson_path(lesson)} for lesson in lessons],
+        "assessments": [
+            {
+                "id": assessment.id,
+                "title": assessment.title,
+                "description": assessment.description,
+                "questions": [
+                    {
+                        "id": question.id,
+                        "text": question.text,
+                        "choices": [
+                            # Without is_correct, which would give the
+                            # answers away.
+                            {"id": choice.id, "text": choice.text}
+                            for choice in question.choices.all()
+                        ],
+                    }
+                    for question in assessment.questions.all()
+                ],
+            }
+            for assessment in assessments
+        ],
+    }
+    return [("course.json", encode(data))], []
+
+
+def lesson_path(lesson):
+    return f"lessons/{lesson['order']:03}-{lesson['id']}"
+
+
+def lesson_part(lesson):
+    path = lesson_path({"id": lesson.id, "order": lesson.order})
+    contents, media = [], []
+    for content in lesson_contents(lesson.id):
+        data = content_data(content, lesson.slot, b"")
+        del data["completed"]
+        data["media"] = media_names(content)
+        media += data["media"]
+        contents.append(data)
+    data = {
+        "id": lesson.id,
+        "order": lesson.order,
+        "title": lesson.title,
+        "description": lesson.description,
+        "contents": contents,
+    }
+    return [(f"{path}/lesson.json", encode(data))], sorted(set(media))
+
+
+def part_key(root, members, media):
+    digest = hashlib.sha256(root.encode())
+    for name, data in members:
+        digest.update(name.encode())
+        digest.update(hashlib.sha256(data).digest())
+    for name in media:
+        modified = default_storage.get_modified_time(name).timestamp()
+        digest.update(f"{name}:{default_storage.size(name)}:{modified}".encode())
+    return digest.hexdigest()[:32]
+
+
+def tar_header(name, size):
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mode = 0o644
+    return info.tobuf(tarfile.PAX_FORMAT)
+
+
+def temporary_path(path):
+    # Per process, as every worker may build the same course.
+    return path.with_name(f"{path.name}.{os.getpid()}.tmp")
+
+
+def write_part(path, root, members, media):
+    """Gzip the tar members of a part, without the end of archive blocks"""
+    temporary = temporary_path(path)
+    with gzip.GzipFile(temporary, "wb", compresslevel=9, mtime=0) as part:
+        for name, data in members:
+            part.write(tar_header(f"{root}/{name}", len(data)))
+            part.write(data)
+            part.write(bytes(-len(data) % tarfile.BLOCKSIZE))
+        for name in media:
+            size = default_storage.size(name)
+            part.write(tar_header(f"{root}/media/{name}", size))
+            with default_storage.open(name, "rb") as file:
+                shutil.copyfileobj(file, part, CHUNK_SIZE)
+            part.write(bytes(-size % tarfile.BLOCKSIZE))
+    os.replace(temporary, path)
+
+
+def build(course_id):
+    """
+    Bring the course's bundle up to date, repacking only the parts that
+    changed, and return its manifest. A deleted course loses its bundle.
+    """
+    # Read the course only once holding the lock, so the last build to
+    # finish is of the newest data.
+    with directory_lock(parts_dir(), fcntl.LOCK_SH), course_lock(course_id):
+        return _build(course_id)
+
+
+def _build(course_id):
+    course = (
+        Course.objects.select_related("subject", "mentor").filter(pk=course_id).first()
+    )
+    if course is None:
+        shutil.rmtree(course_dir(course_id), ignore_errors=True)
+        return None
+    keys, repacked = [], 0
+    for members, media in [
+        course_part(course),
+        *map(lesson_part, Lesson.objects.filter(course=course).order_by("order", "id")),
+    ]:
+        key = part_key(course.slug, members, media)
+        path = parts_dir() / f"{key}.gz"
+        if not path.exists():
+            write_part(path, course.slug, members, media)
+            repacked += 1
+        keys.append(key)
+
+    version = hashlib.sha256("".join(keys).encode()).hexdigest()[:16]
+    directory = course_dir(course_id)
+    directory.mkdir(parents=True, exist_ok=True)
+    bundle = directory / f"{version}.tar.gz"
+    if not bundle.exists():
+        temporary = temporary_path(bundle)
+        with open(temporary, "wb") as file:
+            for key in keys:
+                with open(parts_dir() / f"{key}.gz", "rb") as part:
+                    shutil.copyfileobj(part, file, CHUNK_SIZE)
+            file.write(TRAILER)
+        os.replace(temporary, bundle)
+    manifest = {
+        "course": course.id,
+        "slug": course.slug,
+        "version": version,
+        "size": bundle.stat().st_size,
+        "parts": keys,
+        "repacked": repacked,
+        "built_at": timezone.now().isoformat(),
+    }
+    temporary = temporary_path(directory / "current.json")
+    temporary.write_text(json.dumps(manifest))
+    os.replace(temporary, directory / "current.json")
+    for old in directory.glob("*.tar.gz"):
+        if old != bundle:
+            old.unlink(missing_ok=True)
+    return manifest
+
+
+def prune():
+    """
+    Delete the parts no bundle uses anymore, once the builds under way
+    finish; returns how many
+    """
+    with directory_lock(parts_dir()):
+        used = set()
+        root = Path(settings.COURSE_BUNDLE_DIR)
+        for manifest in root.glob("*/current.json"):
+            try:
+                used.update(json.loads(manifest.read_text())["parts"])
+            except (OSError, ValueError, KeyError):
+                continue
+        pruned = 0
+        for part in parts_dir().glob("*.gz"):
+            if part.stem not in used:
+                part.unlink(missing_ok=True)
+                pruned += 1
+    return pruned
+
+
+def _run_in_background(course_id):
+    # Changes from here on need another build.
+    with _lock:
+        _pending.discard(course_id)
+    try:
+        build(course_id)
+    except Exception:
+        logger.exception("Building the bundle of course %s failed", course_id)
+    finally:
+        # This thread's connections would otherwise stay open forever.
+        connections.close_all()
+
+
+def _submit(course_id):
+    global _executor
+    with _lock:
+        if course_id in _pending:
+            return
+        _pending.add(course_id)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="course-bundles"
+            )
+    _executor.submit(_run_in_background, course_id)
+
+
+def schedule(course_id):
+    """
+    Queue a rebuild of the course's bundle once the surrounding transaction
+    commits, unless one is already waiting
+    """
+    if not settings.COURSE_BUNDLES_IN_BACKGROUND:
+        transaction.on_commit(partial(build, course_id))
+        return
+    transaction.on_commit(partial(_submit, course_id))
@@ -0,0 +1,167 @@
+"""
+The change feed: the course rows created, updated or deleted since a
+version, so clients can sync an edit without downloading the course again.
+
+Every save or delete of a synced row adds a Change, in the same
+transaction. The feed returns the current fields
+of the rows changed after the client's version, or a tombstone for the
+deleted ones, looked up per model with one query each, so its cost follows
+the number of changes rather than the size of the courses. A client without
+a version downloads the course, e.g. as a bundle, and starts from the
+``next`` version of a feed request without ``since``.
+
+Versions follow commit order, so a client never skips a change that
+commits late, say at the end of a long import: ids are handed out as rows
+are written, so a change can commit after one with a higher id. Changes
+are written without a version, and once their transaction commits,
+number_changes() gives every committed change still without one the next
+versions, holding the ChangeCounter row locked until it commits. Numbering
+is serialized, so all versions below one a client has seen are visible.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Max, Min
+
+from .models import (
+    Assessment,
+    Change,
+    ChangeCounter,
+    Choice,
+    Content,
+    Course,
+    File,
+    Image,
+    Lesson,
+    Question,
+    Text,
+    Video,
+)
+
+PAGE_SIZE = 500
+
+# Synced model -> (field with the id of its parent, parent model), up to
+# the course
+PARENTS = {
+    Course: None,
+    Lesson: ("course_id", Course),
+    Content: ("lesson_id", Lesson),
+    Text: ("lesson_content_id", Content),
+    File: ("lesson_content_id", Content),
+    Image: ("lesson_content_id", Content),
+    Video: ("lesson_content_id", Content),
+    Assessment: ("course_id", Course),
+    Question: ("assessment_id", Assessment),
+    Choice: ("question_id", Question),
+}
+SYNCED = {model._meta.label_lower: model for model in PARENTS}
+# Fields the feed leaves out: it goes to students, who mustn't get the
+# answer key.
+HIDDEN = {Choice: {"is_correct"}}
+
+
+def course_id(instance):
+    """The id of the course a synced row belongs to"""
+    model = type(instance)
+    while model is not Course:
+        attname, parent = PARENTS[model]
+        if parent is Course:
+            return getattr(instance, attname)
+        instance = getattr(instance, attname.removesuffix("_id"))
+        model = parent
+    return instance.pk
+
+
+def record(model, rows, deleted=False):
+    """Log changes of ``model`` rows, given as (pk, course id) pairs"""
+    Change.objects.bulk_create(
+        Change(
+            model=model._meta.label_lower,
+            object_id=pk,
+            course_id=course,
+            deleted=deleted,
+        )
+        for pk, course in rows
+    )
+    transaction.on_commit(number_changes, robust=True)
+
+
+def number_changes():
+    """Give the committed changes without a version the next versions"""
+    with transaction.atomic():
+        counter, _ = ChangeCounter.objects.select_for_update().get_or_create(pk=1)
+        pending = Change.objects.filter(version__isnull=True).aggregate(
+            first=Min("id"), last=Max("id")
+        )
+        if pending["first"] is None:
+            return
+        # Versions in id order, above every one given so far. A change that
+        # committed since the aggregate within the range still fits in it.
+        offset = counter.version + 1 - pending["first"]
+        Change.objects.filter(
+            version__isnull=True, id__range=(pending["first"], pending["last"])
+        ).update(version=F("id") + offset)
+        counter.version = pending["last"] + offset
+        counter.save(update_fields=["version"])
+
+
+def latest():
+    """The version to sync from after downloading whole courses"""
+    return Change.objects.aggregate(latest=Max("version"))["latest"] or 0
+
+
+def synced_fields(model):
+    hidden = HIDDEN.get(model, set())
+    return [
+        field.attname
+        for field in model._meta.concrete_fields
+        if field.name not in hidden
+    ]
+
+
+def feed(since, courses=None, limit=PAGE_SIZE):
+    """
+    The changes after version ``since``, of the ``courses`` ids or, if None,
+    of all, with the version to ask from next and whether more are waiting
+    """
+    changes = Change.objects.filter(version__gt=since)
+    if courses is not None:
+        changes = changes.filter(course__in=courses)
+    changes = list(changes.order_by("version")[: limit + 1])
+    more = len(changes) > limit
+    changes = changes[:limit]
+
+    # Only the last change of a row counts.
+    last = {}
+    for change in changes:
+        last[change.model, change.object_id] = change
+    saved = defaultdict(list)
+    for change in last.values():
+        if not change.deleted:
+            saved[change.model].append(change.object_id)
+    rows = {}
+    for label, pks in saved.items():
+        model = SYNCED[label]
+        rows_of_model = model.objects.filter(pk__in=pks).values(*synced_fields(model))
+        for row in rows_of_model:
+            rows[label, row["id"]] = row
+
+    entries = []
+    for change in sorted(last.values(), key=lambda change: change.version):
+        # Deleted since, by a change past this page
+        fields = rows.get((change.model, change.object_id))
+        entries.append(
+            {
+                "version": change.version,
+                "model": change.model,
+                "id": change.object_id,
+                "course": change.course_id,
+                "deleted": fields is None,
+                "fields": fields,
+            }
+        )
+    return {
+        "changes": entries,
+        "next": changes[-1].version if changes else since,
+        "more": more,
+    }
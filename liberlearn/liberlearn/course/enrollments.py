@@ -0,0 +1,60 @@
+"""
+Which courses a user is enrolled in, as a set of course ids.
+
+Loaded at most once per request (memoized on the user object). With a
+shared cache (CACHE_IS_SHARED) also kept across requests, under a per-user
+version that is bumped once a change to the user's enrollments commits.
+"""
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from ..core.cache import bump_versions, get_versions
+from .models import Course
+
+VERSION_KEY = "enrollments-version:{}"
+SET_KEY = "enrollments:{}:{}"
+# Sets of inactive users just expire.
+TIMEOUT = 24 * 60 * 60
+USER_ATTRIBUTE = "_enrolled_course_ids"
+
+
+def load(user):
+    course_ids = Course.students.through.objects.filter(user_id=user.pk).values_list(
+        "course_id", flat=True
+    )
+    return frozenset(course_ids)
+
+
+def enrolled_course_ids(user):
+    """The ids of the courses ``user`` is enrolled in, as a frozenset"""
+    if not user.is_authenticated:
+        return frozenset()
+    course_ids = getattr(user, USER_ATTRIBUTE, None)
+    if course_ids is not None:
+        return course_ids
+    if settings.CACHE_IS_SHARED:
+        (version,) = get_versions(VERSION_KEY.format(user.pk))
+        key = SET_KEY.format(user.pk, version)
+        course_ids = cache.get(key)
+        if course_ids is None:
+            course_ids = load(user)
+            cache.set(key, course_ids, TIMEOUT)
+    else:
+        course_ids = load(user)
+    setattr(user, USER_ATTRIBUTE, course_ids)
+    return course_ids
+
+
+def is_enrolled(user, course):
+    """``course`` may be a Course or a course id"""
+    return getattr(course, "pk", course) in enrolled_course_ids(user)
+
+
+def invalidate(user_ids):
+    # After the commit, or a reader could cache the old set under the new
+    # version.
+    keys = [VERSION_KEY.format(user_id) for user_id in user_ids]
+    transaction.on_commit(partial(bump_versions, keys))
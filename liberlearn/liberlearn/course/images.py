@@ -0,0 +1,173 @@
+"""
+Responsive derivatives for uploaded images.
+
+Each source image under MEDIA_ROOT is resized to a few widths and
+recompressed as WebP and JPEG. Derivative names carry a hash of the source
+bytes, so a URL never changes meaning and can be cached forever; rebuilding
+an unchanged image is a no-op.
+"""
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image as PILImage
+from PIL import ImageOps
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+# Part of every derivative name, raised when the same source starts giving
+# different derivatives so they don't reuse the old URLs
+REVISION = 2
+# model label -> (source field, derivatives field)
+SOURCES = {
+    "course.Image": ("image", "derivatives"),
+    "course.Subject": ("image_link", "image_derivatives"),
+}
+
+_executor = None
+
+
+def source_name(value):
+    """
+    The storage name of a MEDIA_ROOT image, or None for remote URLs that
+    aren't ours to resize.
+    """
+    if not value or "://" in value or value.startswith("//"):
+        return None
+    if value.startswith(settings.MEDIA_URL):
+        value = value[len(settings.MEDIA_URL) :]
+    return value.lstrip("/")
+
+
+def source_url(value):
+    name = source_name(value)
+    return default_storage.url(name) if name else value
+
+
+def flatten(image):
+    """
+    ``image`` in RGB for JPEG, with transparent areas white: converting
+    straight to RGB would turn them black, or whatever colour hides under
+    the alpha channel.
+    """
+    if image.mode in ("RGBA", "LA") or (
+        image.mode == "P" and "transparency" in image.info
+    ):
+        image = image.convert("RGBA")
+        flat = PILImage.new("RGB", image.size, "white")
+        flat.paste(image, mask=image.getchannel("A"))
+        return flat
+    return image.convert("RGB")
+
+
+def build_derivatives(name):
+    """
+    Write the derivatives of the stored image ``name`` and return their
+    descriptions, smallest first.
+    """
+    with default_storage.open(name, "rb") as source:
+        data = source.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    image = ImageOps.exif_transpose(PILImage.open(io.BytesIO(data)))
+    quality = settings.IMAGE_DERIVATIVE_QUALITY
+
+    # Never upscale; the largest derivative is the original, recompressed.
+    widths = sorted(
+        {w for w in settings.IMAGE_DERIVATIVE_WIDTHS if w < image.width} | {image.width}
+    )
+    derivatives = []
+    for width in widths:
+        height = round(image.height * width / image.width)
+        resized = None
+        for ext, (pil_format, mime_type) in FORMATS.items():
+            target = f"derivatives/{digest}-{width}-r{REVISION}.{ext}"
+            if not default_storage.exists(target):
+                if resized is None:
+                    resized = image.resize((width, height), PILImage.Resampling.LANCZOS)
+                output = resized
+                if pil_format == "JPEG" and resized.mode != "RGB":
+                    output = flatten(resized)
+                buffer = io.BytesIO()
+                output.save(buffer, pil_format, quality=quality, optimize=True)
+                default_storage.save(target, ContentFile(buffer.getvalue()))
+            derivatives.append(
+                {
+                    "url": default_storage.url(target),
+                    "width": width,
+                    "height": height,
+                    "type": mime_type,
+                }
+            )
+    return derivatives
+
+
+def srcset(derivatives):
+    """``{mime type: srcset string}`` for ``<picture>`` sources"""
+    sets = {}
+    for item in (derivatives or {}).get("items", []):
+        sets.setdefault(item["type"], []).append(f"{item['url']} {item['width']}w")
+    return {mime_type: ", ".join(urls) for mime_type, urls in sets.items()}
+
+
+def process(label, pk):
+    """Build and store the derivatives of one model instance"""
+    model = apps.get_model(label)
+    source_field, derivatives_field = SOURCES[label]
+    try:
+        value = model.objects.filter(pk=pk).values_list(source_field, flat=True).get()
+        name = source_name(value)
+        derivatives = {"source": value, "items": []}
+        if name and default_storage.exists(name):
+            derivatives["items"] = build_derivatives(name)
+        # update() so saving the result doesn't schedule another build.
+        model.objects.filter(pk=pk).update(**{derivatives_field: derivatives})
+        if label == "course.Image":
+            # Imported here, as the models import this module.
+            from . import bundles, changes
+
+            course_id = changes.course_id(model.objects.get(pk=pk))
+            changes.record(model, [(pk, course_id)])
+            bundles.schedule(course_id)
+    except model.DoesNotExist:
+        pass
+    except Exception:
+        logger.exception("Building image derivatives of %s %s failed", label, pk)
+
+
+def _run_in_background(label, pk):
+    try:
+        process(label, pk)
+    finally:
+        # This thread's connections would otherwise stay open forever.
+        connections.close_all()
+
+
+def schedule(instance):
+    """
+    Queue a derivative build for ``instance`` if its source image changed,
+    once the surrounding transaction commits.
+    """
+    global _executor
+    label = instance._meta.label
+    source_field, derivatives_field = SOURCES[label]
+    value = getattr(instance, source_field)
+    if (getattr(instance, derivatives_field) or {}).get("source") == value:
+        return
+    if not settings.IMAGE_DERIVATIVES_IN_BACKGROUND:
+        transaction.on_commit(partial(process, label, instance.pk))
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="image-derivatives"
+        )
+    transaction.on_commit(
+        partial(_executor.submit, _run_in_background, label, instance.pk)
+    )
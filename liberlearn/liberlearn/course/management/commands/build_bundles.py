@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from liberlearn.course import bundles
+from liberlearn.course.models import Course
+
+
+class Command(BaseCommand):
+    help = (
+        "Bring the offline bundles of the given courses, or of every "
+        "course, up to date, repacking only the lessons that changed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("course", nargs="*", type=int, help="Course ids")
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help="Delete the parts no bundle uses anymore",
+        )
+
+    def handle(self, *args, **options):
+        course_ids = options["course"] or Course.objects.values_list("pk", flat=True)
+        for course_id in course_ids:
+            manifest = bundles.build(course_id)
+            if manifest is None:
+                self.stdout.write(f"course {course_id}: no such course")
+                continue
+            self.stdout.write(
+                f"course {course_id}: {manifest['version']}, "
+                f"{manifest['size']} bytes, {manifest['repacked']} of "
+                f"{len(manifest['parts'])} parts repacked"
+            )
+        if options["prune"]:
+            self.stdout.write(f"{bundles.prune()} unused parts deleted")
@@ -0,0 +1,29 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from liberlearn.course import images
+
+
+class Command(BaseCommand):
+    help = (
+        "Build responsive derivatives for Image items and subject images "
+        "whose source changed, or for all of them with --all"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild every image, not only changed ones",
+        )
+
+    def handle(self, *args, **options):
+        for label, (source_field, derivatives_field) in images.SOURCES.items():
+            model = apps.get_model(label)
+            built = 0
+            rows = model.objects.values_list("pk", source_field, derivatives_field)
+            for pk, value, derivatives in rows.iterator():
+                if options["all"] or (derivatives or {}).get("source") != value:
+                    images.process(label, pk)
+                    built += 1
+            self.stdout.write(f"{label}: {built} processed")
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from liberlearn.course import packages
+from liberlearn.course.models import Course
+
+
+class Command(BaseCommand):
+    help = (
+        "Write a gzipped course package with the given courses (by id or "
+        "slug), or the whole catalog, and everything under them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "courses", nargs="*", help="Course ids or slugs (default: all)"
+        )
+        parser.add_argument(
+            "-o", "--output", help="Package file to write (default: stdout)"
+        )
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options["courses"]:
+            ids = [value for value in options["courses"] if value.isdigit()]
+            courses = courses.filter(pk__in=ids) | courses.filter(
+                slug__in=options["courses"]
+            )
+            if not courses.exists():
+                raise CommandError("No such courses")
+
+        chunks = packages.gzip_stream(packages.export_records(courses))
+        if options["output"]:
+            with open(options["output"], "wb") as output:
+                output.writelines(chunks)
+        else:
+            sys.stdout.buffer.writelines(chunks)
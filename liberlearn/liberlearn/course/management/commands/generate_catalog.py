@@ -0,0 +1,225 @@
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from liberlearn.accounts.models import User
+from liberlearn.course.models import (
+    Assessment,
+    Choice,
+    Content,
+    Course,
+    File,
+    Image,
+    Lesson,
+    Question,
+    Subject,
+    Text,
+    Video,
+)
+
+BATCH_SIZE = 1000
+LOREM = (
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do "
+    "eiusmod tempor incididunt ut labore et dolore magna aliqua. "
+)
+# item model -> (field, value for the nth item)
+ITEMS = {
+    Text: ("content", lambda n: LOREM * (1 + n % 5)),
+    Video: ("url", lambda n: f"https://www.youtube.com/embed/video{n}"),
+    Image: ("image", lambda n: f"https://picsum.photos/seed/{n}/1280/720"),
+    File: ("file", lambda n: f"files/handout-{n}.pdf"),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a synthetic catalog of the given size, "
+        "using bulk inserts, for benchmarks"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--subjects", type=int, default=5)
+        parser.add_argument("--courses-per-subject", type=int, default=10)
+        parser.add_argument("--lessons-per-course", type=int, default=10)
+        for model in ITEMS:
+            name = model._meta.verbose_name_plural
+            parser.add_argument(
+                f"--{name}-per-lesson",
+                dest=f"{model._meta.model_name}s_per_lesson",
+                type=int,
+                default={Text: 2, Video: 1, Image: 1, File: 0}[model],
+            )
+        parser.add_argument("--students", type=int, default=500)
+        parser.add_argument(
+            "--enrollments-per-student",
+            type=int,
+            default=3,
+            help="Courses each student joins, picked at random",
+        )
+        parser.add_argument("--assessments-per-course", type=int, default=1)
+        parser.add_argument("--questions-per-assessment", type=int, default=5)
+        parser.add_argument(
+            "--prefix",
+            default="gen",
+            help="Prefix of the generated slugs and usernames",
+        )
+        parser.add_argument(
+            "--password",
+            default="bench",
+            help="Password of the generated mentor and students",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        prefix = options["prefix"]
+        if Subject.objects.filter(slug__startswith=f"{prefix}-").exists():
+            raise CommandError(f"A catalog with prefix {prefix!r} exists, pick another")
+        self.random = random.Random(options["seed"])
+        self.content_types = {
+            model: ContentType.objects.get_for_model(model) for model in ITEMS
+        }
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            # Hashed once: PBKDF2 per user would dominate the run.
+            password = make_password(options["password"])
+            mentor = User.objects.create(
+                username=f"{prefix}-mentor",
+                role="mentor",
+                is_staff=True,
+                password=password,
+            )
+            students = User.objects.bulk_create(
+                (
+                    User(
+                        username=f"{prefix}-student-{i}",
+                        role="student",
+                        password=password,
+                    )
+                    for i in range(options["students"])
+                ),
+                batch_size=BATCH_SIZE,
+            )
+            courses = []
+            for i in range(options["subjects"]):
+                courses += self.create_subject(i, mentor, options)
+            self.enroll(students, courses, options)
+
+        self.stdout.write(
+            f"{len(courses)} courses and {len(students)} students created "
+            f"in {time.perf_counter() - started:.1f}s; log in as "
+            f"{prefix}-student-0 or {prefix}-mentor with the password "
+            f"{options['password']!r}"
+        )
+
+    def create_subject(self, index, mentor, options):
+        prefix = options["prefix"]
+        subject = Subject.objects.create(
+            title=f"{prefix} subject {index}", slug=f"{prefix}-subject-{index}"
+        )
+        courses = Course.objects.bulk_create(
+            Course(
+                mentor=mentor,
+                subject=subject,
+                title=f"{prefix} course {index}.{i}",
+                slug=f"{prefix}-course-{index}-{i}",
+                overview=LOREM,
+            )
+            for i in range(options["courses_per_subject"])
+        )
+        lessons = Lesson.objects.bulk_create(
+            (
+                Lesson(
+                    course=course,
+                    title=f"Lesson {i}",
+                    description=LOREM,
+                    order=i,
+                    slot=i,
+                )
+                for course in courses
+                for i in range(options["lessons_per_course"])
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        self.create_contents(lessons, mentor, options)
+        self.create_assessments(courses, options)
+        return courses
+
+    def create_contents(self, lessons, mentor, options):
+        kinds = [
+            model
+            for model in ITEMS
+            for _ in range(options[f"{model._meta.model_name}s_per_lesson"])
+        ]
+        contents, items = [], []
+        for lesson in lessons:
+            for order, model in enumerate(kinds):
+                field, value = ITEMS[model]
+                data = value(lesson.pk * len(kinds) + order)
+                # Content.save() points object_id at the lesson.
+                contents.append(
+                    Content(
+                        lesson=lesson,
+                        content_type=self.content_types[model],
+                        object_id=lesson.pk,
+                        order=order,
+                        slot=order,
+                        data=data,
+                    )
+                )
+                items.append((model, field, data))
+        contents = Content.objects.bulk_create(contents, batch_size=BATCH_SIZE)
+
+        by_model = {model: [] for model in ITEMS}
+        for content, (model, field, data) in zip(contents, items):
+            by_model[model].append(
+                model(
+                    mentor=mentor,
+                    lesson_content=content,
+                    title=f"{model._meta.verbose_name} {content.pk}",
+                    **{field: data},
+                )
+            )
+        for model, objs in by_model.items():
+            model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+
+    def create_assessments(self, courses, options):
+        assessments = Assessment.objects.bulk_create(
+            Assessment(
+                course=course, title=f"{course.title} Assessment {i}", description=LOREM
+            )
+            for course in courses
+            for i in range(options["assessments_per_course"])
+        )
+        questions = Question.objects.bulk_create(
+            (
+                Question(assessment=assessment, text=f"Question {i}?")
+                for assessment in assessments
+                for i in range(options["questions_per_assessment"])
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        Choice.objects.bulk_create(
+            (
+                Choice(question=question, text=f"Choice {i}", is_correct=i == 0)
+                for question in questions
+                for i in range(4)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+    def enroll(self, students, courses, options):
+        per_student = min(options["enrollments_per_student"], len(courses))
+        Enrollment = Course.students.through
+        Enrollment.objects.bulk_create(
+            (
+                Enrollment(course_id=course.pk, user_id=student.pk)
+                for student in students
+                for course in self.random.sample(courses, per_student)
+            ),
+            batch_size=BATCH_SIZE,
+        )
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from liberlearn.course import packages
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a course package written by export_course. Subjects that "
+        "already exist are reused; courses whose slug exists are skipped"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("package", help="Package file, or - to read from stdin")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=packages.BATCH_SIZE,
+            help="Rows per insert",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options["package"] == "-":
+                report = packages.import_package(
+                    sys.stdin.buffer, options["batch_size"]
+                )
+            else:
+                with open(options["package"], "rb") as package:
+                    report = packages.import_package(package, options["batch_size"])
+        except (OSError, packages.PackageError) as exc:
+            raise CommandError(exc)
+
+        for label, created in report["created"].items():
+            skipped = report["skipped"][label]
+            if created or skipped:
+                self.stdout.write(f"{label}: {created} created, {skipped} skipped")
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.3 on 2026-10-19 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("course", "0018_alter_content_object_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="image",
+            name="derivatives",
+            field=models.JSONField(default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name="subject",
+            name="image_derivatives",
+            field=models.JSONField(default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.3 on 2026-10-19 13:32
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def number_existing_changes(apps, schema_editor):
+    # Committed already, so their ids are as good as any version.
+    Change = apps.get_model("course", "Change")
+    ChangeCounter = apps.get_model("course", "ChangeCounter")
+    Change.objects.update(version=F("id"))
+    latest = Change.objects.aggregate(latest=Max("id"))["latest"] or 0
+    ChangeCounter.objects.create(pk=1, version=latest)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("course", "0021_change"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name="change",
+            name="course_chan_course__1a439b_idx",
+        ),
+        migrations.AddField(
+            model_name="change",
+            name="version",
+            field=models.PositiveBigIntegerField(db_index=True, null=True),
+        ),
+        migrations.RunPython(number_existing_changes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="change",
+            index=models.Index(
+                fields=["course", "version"], name="course_chan_course__f1c60d_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 4.2.3 on 2026-10-19 13:33
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("course", "0022_change_version"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="progress",
+            name="lessons_completed",
+        ),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 4.2.3 on 2026-10-19 16:10
+
+from collections import defaultdict
+
+from django.db import migrations
+
+import liberlearn.course.fields
+
+CONTENT_SLOTS = 64
+
+
+def give_slots(rows):
+    """
+    Slot each (pk, order) row at its order, as the bitmaps were indexed by
+    order until now, and a row sharing its order with an earlier one past
+    all the orders: which of them a set bit meant can't be told.
+    """
+    slots = {}
+    taken = set()
+    end = max((order for _, order in rows), default=-1) + 1
+    for pk, order in sorted(rows, key=lambda row: (row[1], row[0])):
+        if order in taken:
+            slots[pk] = end
+            end += 1
+        else:
+            slots[pk] = order
+            taken.add(order)
+    return slots
+
+
+def keep_bits(bitmap, indexes):
+    kept = bytearray(bytes(bitmap))
+    for byte in range(len(kept)):
+        for bit in range(8):
+            if byte * 8 + bit not in indexes:
+                kept[byte] &= ~(1 << bit)
+    return bytes(kept.rstrip(b"\0"))
+
+
+def slot_lessons_and_contents(apps, schema_editor):
+    Lesson = apps.get_model("course", "Lesson")
+    Content = apps.get_model("course", "Content")
+    Progress = apps.get_model("course", "Progress")
+
+    lessons = defaultdict(list)
+    for pk, course_id, order in Lesson.objects.values_list("pk", "course_id", "order"):
+        lessons[course_id].append((pk, order))
+    lesson_slots = {}
+    for rows in lessons.values():
+        lesson_slots.update(give_slots(rows))
+    Lesson.objects.bulk_update(
+        [Lesson(pk=pk, slot=slot) for pk, slot in lesson_slots.items()],
+        ["slot"],
+        batch_size=500,
+    )
+
+    contents = defaultdict(list)
+    for pk, lesson_id, order in Content.objects.values_list("pk", "lesson_id", "order"):
+        contents[lesson_id].append((pk, order))
+    content_slots = {}
+    for rows in contents.values():
+        content_slots.update(give_slots(rows))
+    Content.objects.bulk_update(
+        [Content(pk=pk, slot=slot) for pk, slot in content_slots.items()],
+        ["slot"],
+        batch_size=500,
+    )
+
+    # Clear the bits no lesson or content has anymore, so completed lessons
+    # can be counted by the bits set.
+    lesson_bits = defaultdict(set)
+    content_bits = defaultdict(set)
+    lesson_course = {}
+    for pk, course_id, slot in Lesson.objects.values_list("pk", "course_id", "slot"):
+        lesson_bits[course_id].add(slot)
+        lesson_course[pk] = (course_id, slot)
+    for lesson_id, slot in Content.objects.values_list("lesson_id", "slot"):
+        course_id, lesson_slot = lesson_course[lesson_id]
+        if slot < CONTENT_SLOTS:
+            content_bits[course_id].add(lesson_slot * CONTENT_SLOTS + slot)
+    for progress in Progress.objects.iterator():
+        lessons = keep_bits(progress.lessons, lesson_bits[progress.course_id])
+        contents = keep_bits(progress.contents, content_bits[progress.course_id])
+        Progress.objects.filter(pk=progress.pk).update(
+            lessons=lessons, contents=contents, version=progress.version + 1
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("course", "0023_remove_progress_lessons_completed"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lesson",
+            name="slot",
+            field=liberlearn.course.fields.OrderField(
+                blank=True, default=0, editable=False
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="content",
+            name="slot",
+            field=liberlearn.course.fields.OrderField(
+                blank=True, default=0, editable=False
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(slot_lessons_and_contents, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,11 @@
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
-
-# from django.template.loader import render_to_string
+from django.template.loader import render_to_string
 
 from liberlearn.accounts.models import User
 
+from . import images
 from .fields import OrderField
 
 DEFAULT_MENTOR_ID = 2
@@ -23,6 +23,7 @@ class Subject(models.Model):
     intro_video = models.CharField(
         max_length=400, default="https://www.youtube.com/embed/9nkR2LLPiYo"
     )
+    image_derivatives = models.JSONField(default=dict, editable=False)
 
     class Meta:
         ordering = ["title"]
@@ -30,6 +31,10 @@ class Subject(models.Model):
     def __str__(self):
         return self.title
 
+    @property
+    def image_srcset(self):
+        return images.srcset(self.image_derivatives)
+
 
 class Course(models.Model):
     """Course Table, related to an mentor and a Subject"""
@@ -67,6 +72,9 @@ class Lesson(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     order = OrderField(blank=True, for_fields=["course"])
+    # Its bits in the course's Progress bitmaps, kept when lessons are
+    # reordered, see liberlearn.course.progress
+    slot = OrderField(blank=True, for_fields=["course"], editable=False)
 
     def __str__(self):
         return f"{self.order}. {self.title}"
@@ -89,11 +97,18 @@ class Content(models.Model):
     object_id = models.PositiveIntegerField(editable=False)
     item = GenericForeignKey("content_type", "object_id")
     order = OrderField(blank=True, for_fields=["lesson"])
+    # Its bit among the lesson's in the Progress bitmaps, like Lesson.slot
+    slot = OrderField(blank=True, for_fields=["lesson"], editable=False)
     data = models.TextField(blank=False, null=False, editable=True)
 
     def __str__(self):
         return f"{self.content_type}"
 
+    @property
+    def items_name(self):
+        """The reverse accessor of this content's items, e.g. text_content"""
+        return f"{self.content_type.model}_content"
+
     def save(self, *args, **kwargs):
         self.object_id = self.lesson.id
         if self.item:
@@ -125,6 +140,11 @@ class ItemBase(models.Model):
     def __str__(self):
         return self.title
 
+    def render(self):
+        return render_to_string(
+            f"course/content/{self._meta.model_name}.html", {"item": self}
+        )
+
 
 class Text(ItemBase):
     content = models.TextField()
@@ -136,12 +156,90 @@ class File(ItemBase):
 
 class Image(ItemBase):
     image = models.CharField(max_length=200)
+    derivatives = models.JSONField(default=dict, editable=False)
+
+    @property
+    def url(self):
+        return images.source_url(self.image)
+
+    @property
+    def srcset(self):
+        return images.srcset(self.derivatives)
 
 
 class Video(ItemBase):
     url = models.CharField(max_length=200)
 
 
+class Progress(models.Model):
+    """
+    What a student completed of a course, as bitmaps kept on one row per
+    enrollment, see liberlearn.course.progress.
+    """
+
+    student = models.ForeignKey(User, related_name="progress", on_delete=models.CASCADE)
+    course = models.ForeignKey(
+        Course, related_name="progress", on_delete=models.CASCADE
+    )
+    # Bit n set: the lesson with slot n is complete
+    lessons = models.BinaryField(default=b"")
+    # Bit n * CONTENT_SLOTS + m set: the content with slot m of the lesson
+    # with slot n is complete
+    contents = models.BinaryField(default=b"")
+    # Bumped on every write, so concurrent ones can't overwrite each other
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "course"], name="unique_progress"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.student} in {self.course}"
+
+
+class Change(models.Model):
+    """
+    A row of a course created, updated or deleted. The version the change
+    feed counts from is given once the change commits, in commit order, see
+    liberlearn.course.changes.
+    """
+
+    # The model's label, e.g. "course.text"
+    model = models.CharField(max_length=50)
+    object_id = models.PositiveBigIntegerField()
+    # Kept after the course is deleted, for the tombstones of its rows
+    course = models.ForeignKey(
+        Course,
+        related_name="+",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+    )
+    deleted = models.BooleanField(default=False)
+    version = models.PositiveBigIntegerField(null=True, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["course", "version"])]
+
+    def __str__(self):
+        action = "deleted" if self.deleted else "saved"
+        return f"{self.model} {self.object_id} {action}"
+
+
+class ChangeCounter(models.Model):
+    """The last version given to a Change; one row, locked while giving"""
+
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.version)
+
+
 class Assessment(models.Model):
     course = models.ForeignKey(
         Course, related_name="assessments", on_delete=models.CASCADE
@@ -0,0 +1,309 @@
+"""
+Course packages: whole course trees moved between environments.
+
+A package is gzipped JSON Lines. A header line is followed by one record per
+row, parents before children:
+
+    {"model": "course.lesson", "pk": 12, "fields": {"course": 3, ...}}
+
+Foreign keys hold the exporting database's primary keys, except users
+(by username) and content types ("app_label.model"). Exporting streams rows
+straight from the database and importing inserts them with ``bulk_create``
+a batch at a time, remapping keys as it goes, so neither holds more than a
+batch of rows in memory. Enrollments aren't part of a package.
+"""
+import gzip
+import json
+import zlib
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DataError, IntegrityError, transaction
+from django.db.models import Q
+
+from liberlearn.accounts.models import User
+
+from . import changes
+from .models import (
+    DEFAULT_MENTOR_ID,
+    Assessment,
+    Choice,
+    Content,
+    Course,
+    File,
+    Image,
+    Lesson,
+    Question,
+    Subject,
+    Text,
+    Video,
+)
+
+FORMAT = "liberlearn-course-package"
+VERSION = 1
+BATCH_SIZE = 500
+
+# Every model in a package, parents first, with the lookup from its rows to
+# the exported courses.
+MODELS = [
+    (Subject, "courses__in"),
+    (Course, "pk__in"),
+    (Lesson, "course__in"),
+    (Content, "lesson__course__in"),
+    (Text, "lesson_content__lesson__course__in"),
+    (File, "lesson_content__lesson__course__in"),
+    (Image, "lesson_content__lesson__course__in"),
+    (Video, "lesson_content__lesson__course__in"),
+    (Assessment, "course__in"),
+    (Question, "assessment__course__in"),
+    (Choice, "question__assessment__course__in"),
+]
+
+
+class PackageError(Exception):
+    pass
+
+
+def exported_fields(model):
+    return [field for field in model._meta.concrete_fields if not field.primary_key]
+
+
+def timestamp_fields(model):
+    """The fields bulk_create() sets to the current time"""
+    return [
+        field
+        for field in exported_fields(model)
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+
+
+def export_records(courses):
+    """Yield the package lines for ``courses``, a Course queryset"""
+    yield json.dumps({"format": FORMAT, "version": VERSION}) + "\n"
+    for model, lookup in MODELS:
+        fields = exported_fields(model)
+        values = {}
+        for field in fields:
+            if field.related_model is User:
+                values[field.name] = f"{field.name}__username"
+            elif field.related_model is ContentType:
+                values[field.name] = f"{field.name}__model"
+                values["_app_label"] = f"{field.name}__app_label"
+            else:
+                values[field.name] = field.attname
+        rows = (
+            model.objects.filter(**{lookup: courses})
+            .distinct()
+            .order_by("pk")
+            .values("pk", *values.values())
+        )
+        label = model._meta.label_lower
+        for row in rows.iterator(chunk_size=BATCH_SIZE):
+            record = {name: row[column] for name, column in values.items()}
+            if "_app_label" in record:
+                app_label = record.pop("_app_label")
+                model_name = record["content_type"]
+                record["content_type"] = f"{app_label}.{model_name}"
+            yield json.dumps(
+                {"model": label, "pk": row["pk"], "fields": record},
+                cls=DjangoJSONEncoder,
+            ) + "\n"
+
+
+def gzip_stream(lines, chunk_size=64 * 1024):
+    """Compress an iterable of text lines into a stream of gzip chunks"""
+    compressor = zlib.compressobj(wbits=31)
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line.encode())
+        size += len(buffer[-1])
+        if size >= chunk_size:
+            chunk = compressor.compress(b"".join(buffer))
+            buffer, size = [], 0
+            if chunk:
+                yield chunk
+    yield compressor.compress(b"".join(buffer)) + compressor.flush()
+
+
+class Importer:
+    """
+    Insert the records of a package, remapping primary and foreign keys.
+    Subjects are matched with existing ones by slug or title; courses whose
+    slug is already taken are skipped together with everything under them.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.ids = {model: {} for model, _ in MODELS}
+        # model -> new pk -> course id, for the change feed
+        self.course_ids = {model: {} for model in changes.PARENTS}
+        self.models = {model._meta.label_lower: model for model, _ in MODELS}
+        self.users = {}
+        self.content_types = {}
+        self.created = dict.fromkeys(self.models, 0)
+        self.skipped = dict.fromkeys(self.models, 0)
+        self.model = None
+        self.batch = []
+
+    def user_id(self, username):
+        if username not in self.users:
+            self.users[username] = (
+                User.objects.filter(username=username)
+                .values_list("pk", flat=True)
+                .first()
+                or DEFAULT_MENTOR_ID
+            )
+        return self.users[username]
+
+    def content_type(self, natural_key):
+        if natural_key not in self.content_types:
+            content_type = ContentType.objects.get_by_natural_key(
+                *natural_key.split(".")
+            )
+            self.content_types[natural_key] = content_type
+        return self.content_types[natural_key]
+
+    def build(self, model, pk, values):
+        """An unsaved instance for a record, or None to skip it"""
+        fields = {}
+        for field in exported_fields(model):
+            value = values.get(field.name)
+            if field.related_model is User:
+                fields[field.attname] = self.user_id(value)
+            elif field.related_model is ContentType:
+                fields[field.name] = self.content_type(value)
+            elif field.is_relation:
+                if value not in self.ids[field.related_model]:
+                    return None
+                fields[field.attname] = self.ids[field.related_model][value]
+            elif field.name in values:
+                fields[field.attname] = field.to_python(value)
+        if model is Content:
+            # Content.save() sets object_id to the lesson's id.
+            fields["object_id"] = fields["lesson_id"]
+
+        if model is Subject:
+            existing = (
+                Subject.objects.filter(
+                    Q(slug=fields["slug"]) | Q(title=fields["title"])
+                )
+                .values_list("pk", flat=True)
+                .first()
+            )
+            if existing:
+                self.ids[Subject][pk] = existing
+                return None
+        if model is Course and Course.objects.filter(slug=fields["slug"]).exists():
+            return None
+        return model(**fields)
+
+    def flush(self):
+        if not self.batch:
+            return
+        old_pks = [pk for pk, _ in self.batch]
+        timestamps = [field.attname for field in timestamp_fields(self.model)]
+        exported = [
+            [getattr(obj, name) for name in timestamps] for _, obj in self.batch
+        ]
+        try:
+            objs = self.model.objects.bulk_create(obj for _, obj in self.batch)
+        except (IntegrityError, DataError) as exc:
+            raise PackageError(
+                f"Malformed {self.model._meta.label_lower} records: {exc}"
+            )
+        if timestamps:
+            # bulk_create() stamped them with the current time; keep the
+            # package's, where it has them.
+            for obj, values in zip(objs, exported):
+                for name, value in zip(timestamps, values):
+                    if value is not None:
+                        setattr(obj, name, value)
+            self.model.objects.bulk_update(objs, timestamps)
+        ids = self.ids[self.model]
+        for old_pk, obj in zip(old_pks, objs):
+            ids[old_pk] = obj.pk
+        self.created[self.model._meta.label_lower] += len(objs)
+        self.batch = []
+        if self.model in changes.PARENTS:
+            self.record_changes(objs)
+
+    def record_changes(self, objs):
+        """bulk_create() sends no signals, so log the changes here"""
+        course_ids = self.course_ids[self.model]
+        if self.model is Course:
+            course_ids.update((obj.pk, obj.pk) for obj in objs)
+        else:
+            attname, parent = changes.PARENTS[self.model]
+            parents = self.course_ids[parent]
+            for obj in objs:
+                course_ids[obj.pk] = parents[getattr(obj, attname)]
+        changes.record(self.model, [(obj.pk, course_ids[obj.pk]) for obj in objs])
+
+    def add(self, record):
+        if not (
+            isinstance(record, dict)
+            and isinstance(record.get("pk"), int)
+            and isinstance(record.get("fields"), dict)
+        ):
+            raise PackageError("Malformed record, expected model, pk and fields")
+        label, pk = record.get("model"), record["pk"]
+        try:
+            model = self.models[label]
+        except (KeyError, TypeError):
+            raise PackageError(f"Unknown model {label!r}")
+        if model is not self.model:
+            # Records come parents first, so flushing on every change of
+            # model inserts parents before anything refers to them.
+            self.flush()
+            self.model = model
+        try:
+            obj = self.build(model, pk, record["fields"])
+        except KeyError as exc:
+            raise PackageError(f"{label} record {pk} lacks {exc}")
+        except (
+            TypeError,
+            AttributeError,
+            ValueError,
+            ValidationError,
+            ContentType.DoesNotExist,
+        ) as exc:
+            raise PackageError(f"Malformed {label} record {pk}: {exc}")
+        if obj is None:
+            self.skipped[label] += 1
+            return
+        self.batch.append((pk, obj))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def run(self, lines):
+        lines = iter(lines)
+        try:
+            header = json.loads(next(lines))
+        except (StopIteration, ValueError):
+            raise PackageError("Not a course package")
+        if (
+            not isinstance(header, dict)
+            or header.get("format") != FORMAT
+            or header.get("version") != VERSION
+        ):
+            raise PackageError("Unsupported package format")
+        with transaction.atomic():
+            for line in lines:
+                if line.strip():
+                    self.add(json.loads(line))
+            self.flush()
+        return {"created": self.created, "skipped": self.skipped}
+
+
+def import_package(file, batch_size=BATCH_SIZE):
+    """
+    Import a package from a binary file object, in one transaction. Returns
+    the rows created and skipped per model.
+    """
+    try:
+        with gzip.open(file, "rt", encoding="utf-8") as lines:
+            return Importer(batch_size).run(lines)
+    except (OSError, EOFError, ValueError) as exc:
+        raise PackageError(f"Unreadable package: {exc}")
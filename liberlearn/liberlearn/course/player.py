@@ -0,0 +1,107 @@
+"""
+Everything a student's lesson player shows for one lesson, in one payload.
+
+Low-bandwidth clients get the lesson's rendered contents, the course outline
+with previous/next pointers and the student's progress from one request,
+which runs the same few queries however big the course is: the course, its
+outline, the student's progress, the lesson's contents and one per kind of
+item those contents hold.
+"""
+from collections import defaultdict
+
+from django.db.models import prefetch_related_objects
+from django.http import Http404
+from django.utils.html import format_html_join
+
+from .models import Content, Course, Lesson, Progress
+from .progress import CONTENT_SLOTS, content_index, has_bit, percent
+
+
+def lesson_player(student, course_id, lesson_id=None):
+    """
+    The player for a lesson of the course, by default the first one the
+    student hasn't completed
+    """
+    course = Course.objects.filter(pk=course_id).values("id", "title", "slug").first()
+    if course is None:
+        raise Http404("No such course.")
+    outline = list(
+        Lesson.objects.filter(course_id=course_id)
+        .order_by("order", "id")
+        .values("id", "order", "slot", "title", "description")
+    )
+    progress = (
+        Progress.objects.filter(student=student, course_id=course_id)
+        .values("lessons", "contents")
+        .first()
+    ) or {"lessons": b"", "contents": b""}
+    completed_lessons = bytes(progress["lessons"])
+    completed_contents = bytes(progress["contents"])
+    for entry in outline:
+        entry["completed"] = has_bit(completed_lessons, entry["slot"])
+
+    if lesson_id is not None:
+        position = next(
+            (i for i, entry in enumerate(outline) if entry["id"] == lesson_id), None
+        )
+        if position is None:
+            raise Http404("No such lesson in this course.")
+    else:
+        position = next(
+            (i for i, entry in enumerate(outline) if not entry["completed"]), 0
+        )
+
+    lesson = None
+    if outline:
+        lesson = dict(outline[position])
+        lesson["contents"] = [
+            content_data(content, lesson["slot"], completed_contents)
+            for content in lesson_contents(lesson["id"])
+        ]
+        del lesson["slot"]
+    for entry in outline:
+        del entry["description"], entry["slot"]
+
+    completed = sum(entry["completed"] for entry in outline)
+    return {
+        "course": course,
+        "lesson": lesson,
+        "outline": outline,
+        "previous": outline[position - 1]["id"] if position else None,
+        "next": (outline[position + 1]["id"] if position + 1 < len(outline) else None),
+        "progress": {
+            "lessons": len(outline),
+            "lessons_completed": completed,
+            "percent": percent(completed, len(outline)),
+        },
+    }
+
+
+def content_data(content, lesson_slot, completed_contents):
+    items = getattr(content, content.items_name).all()
+    return {
+        "id": content.id,
+        "order": content.order,
+        "type": content.content_type.model,
+        "title": items[0].title if items else "",
+        "completed": content.slot < CONTENT_SLOTS
+        and has_bit(completed_contents, content_index(lesson_slot, content.slot)),
+        # Rendered by autoescaping templates, so safe to show as is
+        "html": format_html_join("", "{}", ((item.render(),) for item in items)),
+    }
+
+
+def lesson_contents(lesson_id):
+    """The lesson's contents, with their items prefetched"""
+    contents = list(
+        Content.objects.filter(lesson_id=lesson_id)
+        .select_related("content_type")
+        .order_by("order", "id")
+    )
+    # Only query the kinds of items the lesson has.
+    by_kind = defaultdict(list)
+    for content in contents:
+        by_kind[content.items_name].append(content)
+    for items_name, group in by_kind.items():
+        prefetch_related_objects(group, items_name)
+    return contents
@@ -0,0 +1,174 @@
+"""
+Lesson and content completion, kept as bitmaps on one Progress row per
+student and course instead of a row per completed item.
+
+A lesson's bit is its ``slot``, which unlike its ``order`` stays put when
+lessons are reordered; each lesson has CONTENT_SLOTS bits of its own for
+its contents, by content ``slot``. Completing every content of a lesson
+completes the lesson. Writes are compare-and-swap on ``Progress.version``,
+so concurrent requests of the same student don't lose each other's
+completions.
+
+Deleting a lesson or content clears its bits, so a new one taking its slot
+starts out incomplete and the bits set in ``Progress.lessons`` are exactly
+the completed lessons.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Course, Lesson, Progress
+
+CONTENT_SLOTS = 64
+
+
+def has_bit(bitmap, index):
+    byte = index // 8
+    return byte < len(bitmap) and bool(bitmap[byte] & (1 << index % 8))
+
+
+def set_bit(bitmap, index):
+    bitmap = bytearray(bitmap)
+    byte = index // 8
+    if byte >= len(bitmap):
+        bitmap.extend(bytes(byte + 1 - len(bitmap)))
+    bitmap[byte] |= 1 << index % 8
+    return bytes(bitmap)
+
+
+def clear_bits(bitmap, indexes):
+    bitmap = bytearray(bitmap)
+    for index in indexes:
+        if index // 8 < len(bitmap):
+            bitmap[index // 8] &= ~(1 << index % 8)
+    return bytes(bitmap)
+
+
+def count_bits(bitmap):
+    return bin(int.from_bytes(bitmap, "little")).count("1")
+
+
+def content_index(lesson_slot, content_slot):
+    if content_slot >= CONTENT_SLOTS:
+        raise ValueError(
+            f"Only the first {CONTENT_SLOTS} contents of a lesson are tracked"
+        )
+    return lesson_slot * CONTENT_SLOTS + content_slot
+
+
+def update(student, course_id, change):
+    """
+    Apply ``change(lessons, contents)``, which returns both bitmaps, to the
+    student's progress in the course, and return the progress
+    """
+    progress, _ = Progress.objects.get_or_create(student=student, course_id=course_id)
+    return apply(progress, change)
+
+
+def apply(progress, change):
+    while True:
+        lessons = bytes(progress.lessons)
+        contents = bytes(progress.contents)
+        new_lessons, new_contents = change(lessons, contents)
+        if (new_lessons, new_contents) == (lessons, contents):
+            return progress
+        values = {
+            "lessons": new_lessons,
+            "contents": new_contents,
+            "updated_at": timezone.now(),
+        }
+        updated = Progress.objects.filter(
+            pk=progress.pk, version=progress.version
+        ).update(version=F("version") + 1, **values)
+        if updated:
+            for name, value in values.items():
+                setattr(progress, name, value)
+            progress.version += 1
+            return progress
+        # Someone else wrote first; start over from their bitmaps.
+        progress.refresh_from_db()
+
+
+def complete_lesson(student, lesson):
+    return update(
+        student,
+        lesson.course_id,
+        lambda lessons, contents: (set_bit(lessons, lesson.slot), contents),
+    )
+
+
+def complete_content(student, content):
+    """Also completes the lesson once all its contents are"""
+    lesson = content.lesson
+    index = content_index(lesson.slot, content.slot)
+    siblings = [
+        content_index(lesson.slot, slot)
+        for slot in lesson.contents.values_list("slot", flat=True)
+        if slot < CONTENT_SLOTS
+    ]
+
+    def change(lessons, contents):
+        contents = set_bit(contents, index)
+        if all(has_bit(contents, sibling) for sibling in siblings):
+            lessons = set_bit(lessons, lesson.slot)
+        return lessons, contents
+
+    return update(student, lesson.course_id, change)
+
+
+def forget(course_id, lesson_slots=(), content_indexes=()):
+    """
+    Clear the bits of deleted lessons, with those of their contents, and of
+    deleted contents from every student's progress in the course
+    """
+    content_indexes = [
+        *content_indexes,
+        *(
+            slot * CONTENT_SLOTS + index
+            for slot in lesson_slots
+            for index in range(CONTENT_SLOTS)
+        ),
+    ]
+
+    def change(lessons, contents):
+        return (
+            clear_bits(lessons, lesson_slots),
+            clear_bits(contents, content_indexes),
+        )
+
+    for progress in Progress.objects.filter(course_id=course_id):
+        apply(progress, change)
+
+
+def summary(progress):
+    """Completion of the progress's course, for a response"""
+    total = Lesson.objects.filter(course_id=progress.course_id).count()
+    completed = count_bits(bytes(progress.lessons))
+    return {
+        "course": progress.course_id,
+        "lessons": total,
+        "lessons_completed": completed,
+        "percent": percent(completed, total),
+    }
+
+
+def percent(completed, total):
+    return round(100 * completed / total) if total else 0
+
+
+def dashboard(student):
+    """
+    The student's courses, with their ``lesson_count`` and
+    ``lessons_completed``, in one query
+    """
+    bitmap = Progress.objects.filter(student=student, course=OuterRef("pk")).values(
+        "lessons"
+    )
+    # Meta.ordering is dropped from aggregate queries, so restate it.
+    courses = list(
+        Course.objects.filter(students=student)
+        .annotate(lesson_count=Count("lessons"), bitmap=Subquery(bitmap))
+        .order_by(*Course._meta.ordering)
+    )
+    for course in courses:
+        course.lessons_completed = count_bits(bytes(course.bitmap or b""))
+    return courses
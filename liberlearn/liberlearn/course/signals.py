@@ -0,0 +1,93 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from liberlearn.core import metrics
+
+from . import bundles, changes, enrollments, images, progress
+from .models import Assessment, Content, Course, Image, Lesson, Subject
+
+
+@receiver(post_save, sender=Image)
+@receiver(post_save, sender=Subject)
+def schedule_image_derivatives(sender, instance, raw=False, **kwargs):
+    if not raw:
+        images.schedule(instance)
+
+
+@receiver(m2m_changed, sender=Course.students.through)
+def invalidate_enrollments(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # user.courses_joined changed
+        if action in ("post_add", "post_remove", "post_clear"):
+            instance.__dict__.pop(enrollments.USER_ATTRIBUTE, None)
+            enrollments.invalidate([instance.pk])
+        return
+    # course.students changed; clear() doesn't say who was removed, so
+    # remember them beforehand.
+    if action == "pre_clear":
+        instance._cleared_student_ids = list(
+            instance.students.values_list("pk", flat=True)
+        )
+    elif action == "post_clear":
+        enrollments.invalidate(instance.__dict__.pop("_cleared_student_ids", []))
+    elif action in ("post_add", "post_remove"):
+        enrollments.invalidate(pk_set)
+
+
+@receiver(m2m_changed, sender=Course.students.through)
+def count_enrollments(sender, action, pk_set, **kwargs):
+    # pk_set only holds the rows actually added, from either side.
+    if action == "post_add" and pk_set:
+        metrics.ENROLLMENTS.inc(len(pk_set))
+
+
+@receiver(post_save, sender=Assessment)
+def count_assessments(sender, created, raw=False, **kwargs):
+    if created and not raw:
+        metrics.ASSESSMENTS.inc()
+
+
+def deleted_with(origin):
+    """The model whose deletion cascaded to this one"""
+    return getattr(origin, "model", type(origin))
+
+
+@receiver(post_delete, sender=Lesson)
+def forget_lesson_progress(sender, instance, origin=None, **kwargs):
+    # With the course, its progress goes too.
+    if deleted_with(origin) is not Course:
+        progress.forget(instance.course_id, lesson_slots=[instance.slot])
+
+
+@receiver(post_delete, sender=Content)
+def forget_content_progress(sender, instance, origin=None, **kwargs):
+    # Otherwise the lesson's own deletion clears the bits.
+    if deleted_with(origin) in (Course, Lesson):
+        return
+    lesson = (
+        Lesson.objects.filter(pk=instance.lesson_id).values("course_id", "slot").first()
+    )
+    if lesson and instance.slot < progress.CONTENT_SLOTS:
+        progress.forget(
+            lesson["course_id"],
+            content_indexes=[progress.content_index(lesson["slot"], instance.slot)],
+        )
+
+
+def record_change(sender, instance, signal, raw=False, **kwargs):
+    """Log the change, and rebuild the bundle of the course"""
+    if raw:
+        return
+    try:
+        course_id = changes.course_id(instance)
+    except ObjectDoesNotExist:
+        # Its parent is gone already, and the parent's tombstone covers it.
+        return
+    changes.record(sender, [(instance.pk, course_id)], deleted=signal is post_delete)
+    bundles.schedule(course_id)
+
+
+for model in changes.PARENTS:
+    post_save.connect(record_change, sender=model)
+    post_delete.connect(record_change, sender=model)
@@ -1,5 +1,7 @@
 from django import template
 
+from ..enrollments import is_enrolled
+
 register = template.Library()
 
 
@@ -9,3 +11,9 @@ def model_name(obj):
         return obj._meta.model_name
     except AttributeError:
         return None
+
+
+@register.filter
+def enrolled(course, user):
+    """``{% if course|enrolled:request.user %}``"""
+    return is_enrolled(user, course)
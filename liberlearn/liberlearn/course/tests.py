@@ -1,3 +1,127 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+
+from liberlearn.accounts.models import User
+from liberlearn.accounts.tokens import issue_token
+from liberlearn.core.querybudget import query_budget
+
+from .models import Content, Lesson
+
+
+class CatalogTestCase(TestCase):
+    """
+    A small generated catalog, with every kind of content, and a student
+    enrolled in some of its courses
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "generate_catalog",
+            subjects=2,
+            courses_per_subject=2,
+            lessons_per_course=3,
+            files_per_lesson=1,
+            students=2,
+            enrollments_per_student=2,
+            stdout=StringIO(),
+        )
+        cls.student = User.objects.get(username="gen-student-0")
+        cls.course = cls.student.courses_joined.order_by("pk").first()
+        cls.lesson = cls.course.lessons.order_by("order").last()
+        cls.content = Content.objects.filter(lesson=cls.lesson).first()
+
+    def setUp(self):
+        cache.clear()
+        token, _ = issue_token(self.student)
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+
+    def assertWithinBudget(self, url_name, url, method="get"):
+        """
+        Request ``url`` twice, the second time within the query budget of
+        ``url_name``, as budgets count the queries with warm caches
+        """
+        request = getattr(self.client, method)
+        self.assertLess(request(url).status_code, 400)
+        with query_budget(url_name):
+            response = request(url)
+        self.assertLess(response.status_code, 400)
+        return response
+
+
+class QueryBudgetTests(CatalogTestCase):
+    def test_progress(self):
+        self.assertWithinBudget("progress", reverse("progress"))
+
+    def test_lesson_complete(self):
+        self.assertWithinBudget(
+            "lesson-complete", reverse("lesson-complete", args=[self.lesson.pk]), "post"
+        )
+
+    def test_content_complete(self):
+        self.assertWithinBudget(
+            "content-complete",
+            reverse("content-complete", args=[self.content.pk]),
+            "post",
+        )
+
+    def test_lesson_player(self):
+        self.assertWithinBudget(
+            "lesson-player", reverse("lesson-player", args=[self.course.pk])
+        )
+
+    def test_lesson_player_lesson(self):
+        self.assertWithinBudget(
+            "lesson-player-lesson",
+            reverse("lesson-player-lesson", args=[self.course.pk, self.lesson.pk]),
+        )
+
+
+class ProgressTests(CatalogTestCase):
+    def complete(self, lesson):
+        url = reverse("lesson-complete", args=[lesson.pk])
+        return self.client.post(url).json()
+
+    def outline(self):
+        player = self.client.get(reverse("lesson-player", args=[self.course.pk]))
+        return {entry["id"]: entry["completed"] for entry in player.json()["outline"]}
+
+    def test_reordering_keeps_completions(self):
+        first, *others = self.course.lessons.order_by("order")
+        self.complete(first)
+        mentor = User.objects.get(username="gen-mentor")
+        self.client.force_login(mentor)
+        orders = {
+            first.pk: len(others),
+            **{lesson.pk: i for i, lesson in enumerate(others)},
+        }
+        response = self.client.post(
+            reverse("lesson_order"), orders, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.client.logout()
+
+        outline = self.outline()
+        self.assertTrue(outline[first.pk])
+        self.assertEqual(sum(outline.values()), 1)
+        (course,) = [
+            course
+            for course in self.client.get(reverse("progress")).json()
+            if course["course"] == self.course.pk
+        ]
+        self.assertEqual(course["lessons_completed"], 1)
 
-# Create your tests here.
+    def test_deleted_lessons_leave_no_completion(self):
+        lesson = self.course.lessons.order_by("order").last()
+        self.complete(lesson)
+        slot = lesson.slot
+        lesson.delete()
+        replacement = Lesson.objects.create(course=self.course, title="New")
+        self.assertEqual(replacement.slot, slot)
+        self.assertFalse(self.outline()[replacement.pk])
+        summary = self.complete(self.course.lessons.order_by("order").first())
+        self.assertEqual(summary["lessons_completed"], 1)
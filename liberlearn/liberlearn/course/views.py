@@ -7,6 +7,7 @@ from django.contrib.auth.mixins import (
     PermissionRequiredMixin,
 )
 from django.core.cache import cache
+from django.db import transaction
 from django.db.models import Count
 from django.forms.models import modelform_factory
 from django.shortcuts import get_object_or_404, redirect
@@ -18,6 +19,7 @@ from django.views.generic.list import ListView
 
 from liberlearn.students.forms import CourseEnrollForm
 
+from . import bundles, changes
 from .forms import LessonFormSet
 from .models import Content, Course, Lesson, Subject
 
@@ -172,12 +174,28 @@ class LessonContentListView(TemplateResponseMixin, View):
         return self.render_to_response({"lesson": lesson})
 
 
+def record_reorder(model, rows):
+    """update() sends no signals, so log the changes here"""
+    rows = list(rows)
+    changes.record(model, rows)
+    for course_id in {course_id for _, course_id in rows}:
+        bundles.schedule(course_id)
+
+
 class LessonOrderView(
     CsrfExemptMixin, JsonRequestResponseMixin, View, AdminMixin
 ):
     def post(self, request):
-        for id, order in self.request_json.items():
-            Lesson.objects.filter(id=id).update(order=order)
+        # One transaction for the whole reorder instead of a commit per row.
+        with transaction.atomic():
+            for id, order in self.request_json.items():
+                Lesson.objects.filter(id=id).update(order=order)
+            record_reorder(
+                Lesson,
+                Lesson.objects.filter(id__in=self.request_json).values_list(
+                    "id", "course_id"
+                ),
+            )
         return self.render_json_response({"saved": "OK"})
 
 
@@ -185,10 +203,15 @@ class ContentOrderView(
     AdminMixin, CsrfExemptMixin, JsonRequestResponseMixin, View
 ):
     def post(self, request):
-        for id, order in self.request_json.items():
-            Content.objects.filter(
-                id=id,
-            ).update(order=order)
+        with transaction.atomic():
+            for id, order in self.request_json.items():
+                Content.objects.filter(id=id).update(order=order)
+            record_reorder(
+                Content,
+                Content.objects.filter(id__in=self.request_json).values_list(
+                    "id", "lesson__course_id"
+                ),
+            )
         return self.render_json_response({"saved": "OK"})
 
 
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 import dj_database_url
@@ -42,16 +43,21 @@ INSTALLED_APPS = [
     "liberlearn.course",
     "liberlearn.accounts",
     "liberlearn.students",
+    "liberlearn.core",
 ]
 
 MIDDLEWARE = [
+    "liberlearn.core.middleware.ServerTimingMiddleware",
+    "liberlearn.core.middleware.MetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "liberlearn.core.middleware.WhiteNoiseMiddleware",
+    "liberlearn.core.middleware.QueryBudgetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "liberlearn.core.middleware.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -119,6 +125,57 @@ DATABASES = {
 db_from_env = dj_database_url.config(conn_max_age=500)
 DATABASES["default"].update(db_from_env)
 
+# SQLite profile for single-box deployments: several gunicorn workers share
+# one file, so run it in WAL mode and queue writers instead of failing them.
+# Set DJANGO_SQLITE_PROFILE=False to fall back to the stock backend.
+if (
+    DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3"
+    and os.environ.get("DJANGO_SQLITE_PROFILE", "") != "False"
+):
+    DATABASES["default"]["ENGINE"] = "liberlearn.core.db.backends.sqlite3"
+    DATABASES["default"].setdefault("CONN_MAX_AGE", 500)
+    DATABASES["default"]["OPTIONS"] = {
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "mmap_size": 128 * 1024 * 1024,
+        "cache_size": -64 * 1024,
+        "busy_timeout": 5000,
+        "lock_retries": 5,
+        "lock_backoff": 0.05,
+        **DATABASES["default"].get("OPTIONS", {}),
+    }
+
+# Shared cache, needed for anything that must hold across gunicorn workers
+# (token revocations, rate limits). Falls back to a per-process one. Both
+# backends count their reads in the request timings.
+CACHES = {
+    "default": {
+        "BACKEND": "liberlearn.core.cache_backends.LocMemCache",
+    }
+}
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "liberlearn.core.cache_backends.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+            "KEY_PREFIX": "liberlearn",
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            },
+        }
+    }
+# Whether every process sees the same cache. Data that is invalidated on
+# change is only cached across requests when it is; with a per-process
+# cache the other workers wouldn't hear of the change.
+CACHE_IS_SHARED = bool(os.environ.get("REDIS_URL"))
+
+# Sessions live in the cache when it is shared, and are written through to
+# the database only when they change, or once a day to slide their expiry
+# forward.
+SESSION_ENGINE = "liberlearn.core.sessions.backends.cached_db"
+SESSION_SAVE_EVERY_REQUEST = True
+SESSION_REFRESH_INTERVAL = 24 * 60 * 60
+
 LANGUAGE_CODE = "en-us"
 
 TIME_ZONE = "Africa/Lagos"
@@ -137,6 +194,21 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, "course", "static")]
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media/")
 
+# Responsive derivatives of uploaded images, written under MEDIA_ROOT by a
+# background thread after the image is saved.
+IMAGE_DERIVATIVE_WIDTHS = (320, 640, 1280)
+IMAGE_DERIVATIVE_QUALITY = 80
+IMAGE_DERIVATIVES_IN_BACKGROUND = True
+
+# Offline course bundles and their parts, rebuilt by a background thread
+# after a course changes, see liberlearn.course.bundles.
+COURSE_BUNDLE_DIR = BASE_DIR / "bundles"
+COURSE_BUNDLES_IN_BACKGROUND = True
+
+# Rows of a CSV provisioned through the API, each hashing a password in the
+# request; bigger files go through the provision_students command.
+PROVISION_MAX_ROWS = 50
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -146,6 +218,9 @@ AUTHENTICATION_BACKENDS = [
     "liberlearn.accounts.backends.EmailOrUsernameModelBackend"
 ]
 AUTH_USER_MODEL = "accounts.User"
+# Seconds a session's user and role profile stay cached between requests,
+# if CACHE_IS_SHARED
+AUTH_USER_CACHE_TIMEOUT = 60
 
 LOGIN_REDIRECT_URL = reverse_lazy("admin:index")
 LOGOUT_REDIRECT_URL = reverse_lazy("schema_api")
@@ -156,9 +231,117 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.DjangoModelPermissionsOrAnonReadOnly"
     ],
+    # Proxies in front of the app (1 on Heroku), for client IPs.
+    "NUM_PROXIES": (
+        int(os.environ["NUM_PROXIES"]) if "NUM_PROXIES" in os.environ else None
+    ),
+}
+
+# Token buckets per scope, see liberlearn.core.ratelimit. "user" and "ip"
+# buckets are per client, "endpoint" is shared by everyone. Client IPs come
+# from REST_FRAMEWORK["NUM_PROXIES"].
+RATE_LIMITS = {
+    "enroll": {"user": "5/min", "ip": "30/min", "endpoint": "50/s"},
+    "login": {"user": "5/min", "ip": "20/min", "endpoint": "20/s"},
+    "assessments": {"user": "10/min", "ip": "60/min", "endpoint": "50/s"},
+}
+
+# Lifetime in seconds of the signed access tokens from /api/token/.
+API_TOKEN_LIFETIME = 60 * 60
+# Token revocations must hold in every worker and across restarts, so
+# without a shared cache they go in a database table (created by the
+# accounts migrations).
+if CACHE_IS_SHARED:
+    API_TOKEN_CACHE = "default"
+else:
+    API_TOKEN_CACHE = "tokens"
+    CACHES["tokens"] = {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "accounts_token_revocations",
+    }
+
+# The most queries a view may run per request with warm caches, by URL
+# name, see liberlearn.core.querybudget. QueryBudgetMiddleware "warn"s or
+# "raise"s on an overrun, or isn't used when the action is None. Views
+# taking API tokens count one query for the revocation lookup, which only
+# hits the database without a shared cache.
+QUERY_BUDGETS = {
+    "subject-list": 5,
+    "subject-detail": 5,
+    "course-list": 4,
+    "course-detail": 4,
+    "course-contents": 5,
+    "assessment-list": 3,
+    "assessment-detail": 3,
+    "progress": 3,
+    "lesson-complete": 5,
+    "content-complete": 6,
+    "lesson-player": 10,
+    "lesson-player-lesson": 10,
+    "changes": 14,
+    "async-subject-list": 5,
+    "async-subject-detail": 5,
+    "async-course-list": 4,
+    "async-course-detail": 4,
+    "async-course-contents": 5,
+}
+QUERY_BUDGET_ACTION = None
+
+# Share of requests timed by ServerTimingMiddleware, from 0 (off) to 1.
+SERVER_TIMING_SAMPLE_RATE = float(os.environ.get("SERVER_TIMING_SAMPLE_RATE", 0.01))
+# Send its Server-Timing header to everyone, not only to staff.
+SERVER_TIMING_HEADER = False
+
+# Prometheus metrics at /metrics, see liberlearn.core.metrics. Every process
+# writes its own values to METRICS_DIR at most every METRICS_FLUSH_INTERVAL
+# seconds. Scrapes must send METRICS_TOKEN as a bearer token; without one
+# set, only staff can see them.
+METRICS_DIR = os.environ.get(
+    "METRICS_DIR", os.path.join(tempfile.gettempdir(), "liberlearn-metrics")
+)
+METRICS_FLUSH_INTERVAL = 1
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+# Queries slower than this are logged to SLOW_QUERY_LOG, and a share of
+# them explained, see liberlearn.core.slowqueries. None turns it off.
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 100))
+SLOW_QUERY_EXPLAIN_RATE = 0.1
+SLOW_QUERY_LOG = os.environ.get(
+    "SLOW_QUERY_LOG",
+    os.path.join(tempfile.gettempdir(), "liberlearn-slow-queries.jsonl"),
+)
+
+# Requests profiled on demand, see liberlearn.core.profiling
+PROFILING_DIR = os.path.join(MEDIA_ROOT, "profiles")
+PROFILING_INTERVAL = 0.001
+
+# Worker memory diagnostics, see liberlearn.core.memory. Frames kept per
+# allocation when tracing; 0 leaves tracing off until asked for.
+MEMORY_TRACE_FRAMES = int(os.environ.get("MEMORY_TRACE_FRAMES", 0))
+MEMORY_REPORT_DIR = os.path.join(MEDIA_ROOT, "memory")
+# Resident size past which a worker is replaced after its current request,
+# unset for no limit.
+MEMORY_CEILING_MB = int(os.environ.get("MEMORY_CEILING_MB", 0)) or None
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        # One JSON line per timed request
+        "liberlearn.timing": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
 }
 
 SPECTACULAR_SETTINGS = {
     "TITLE": "LiberLearn Education Platform",
 }
+# Prebuilt schema artifacts, see `manage.py build_schema`.
+OPENAPI_SCHEMA_DIR = BASE_DIR / "openapi"
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
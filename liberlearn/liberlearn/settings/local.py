@@ -1,5 +1,11 @@
 from .base import *
 
+# Log views that run more queries than their QUERY_BUDGETS entry.
+QUERY_BUDGET_ACTION = "warn"
+# Time every request.
+SERVER_TIMING_SAMPLE_RATE = 1
+SERVER_TIMING_HEADER = True
+
 # from .base import BASE_DIR
 
 # CACHES = {
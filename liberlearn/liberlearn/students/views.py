@@ -1,11 +1,15 @@
+from django.http import Http404
 from django.urls import reverse_lazy
 from django.views.generic.edit import CreateView, FormView
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic.list import ListView
-from django.views.generic.detail import DetailView
+from django.views.generic.base import TemplateView
+from liberlearn.course.enrollments import is_enrolled
 from liberlearn.course.models import Course
+from liberlearn.course.player import lesson_player
+from liberlearn.course.progress import dashboard
 from .forms import CourseEnrollForm
 
 
@@ -28,7 +32,8 @@ class StudentEnrollCourseView(LoginRequiredMixin, FormView):
 
     def form_valid(self, form):
         self.course = form.cleaned_data["course"]
-        self.course.students.add(self.request.user)
+        if not is_enrolled(self.request.user, self.course):
+            self.course.students.add(self.request.user)
         return super().form_valid(form)
 
     def get_success_url(self):
@@ -40,26 +45,19 @@ class StudentCourseListView(LoginRequiredMixin, ListView):
     template_name = "students/course/list.html"
 
     def get_queryset(self):
-        qs = super().get_queryset()
-        return qs.filter(students__in=[self.request.user])
+        return dashboard(self.request.user)
 
 
-class StudentCourseDetailView(DetailView):
-    model = Course
+class StudentCourseDetailView(TemplateView):
     template_name = "students/course/detail.html"
 
-    def get_queryset(self):
-        qs = super().get_queryset()
-        return qs.filter(students__in=[self.request.user])
-
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # get course object
-        course = self.get_object()
-        if "lesson_id" in self.kwargs:
-            # get current lesson
-            context["lesson"] = course.lessons.get(id=self.kwargs["lesson_id"])
-        else:
-            # get first lesson
-            context["lesson"] = course.lessons.all()[0]
+        if not is_enrolled(self.request.user, self.kwargs["pk"]):
+            raise Http404("You are not enrolled in this course.")
+        context.update(
+            lesson_player(
+                self.request.user, self.kwargs["pk"], self.kwargs.get("lesson_id")
+            )
+        )
         return context
@@ -3,24 +3,28 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.contrib.auth import views as auth_views
 from django.urls import include, path
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
-
+from liberlearn.api.schema import SchemaView, SwaggerView
 from liberlearn.api.urls import urlpatterns as api_urls
+from liberlearn.core.ratelimit import ratelimit
+from liberlearn.core.views import memory_view, metrics_view, profile_view
 
 # from liberlearn.course import views
 
 urlpatterns = [
     path("", include(api_urls), name="home"),
-    path("accounts/login/", auth_views.LoginView.as_view(), name="login"),
+    path(
+        "accounts/login/",
+        ratelimit("login", user_field="username")(auth_views.LoginView.as_view()),
+        name="login",
+    ),
     path("accounts/logout/", auth_views.LogoutView.as_view(), name="logout"),
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
+    path("profiles/<str:name>", profile_view, name="profile"),
+    path("diagnostics/memory", memory_view, name="diagnostics-memory"),
     path("api/", include(api_urls), name="api"),
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
-    path(
-        "api/schema/docs",
-        SpectacularSwaggerView.as_view(url_name="schema"),
-        name="schema_api",
-    ),
+    path("api/schema/", SchemaView.as_view(), name="schema"),
+    path("api/schema/docs", SwaggerView.as_view(), name="schema_api"),
     path("courses/", include("liberlearn.course.urls")),
     path("students/", include("liberlearn.students.urls")),
 ]